@@ -0,0 +1,201 @@
+import argparse
+import multiprocessing
+import os
+import random
+import sys
+from collections import Counter
+from contextlib import contextmanager
+
+import degrees
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python analytics.py [directory] [--source NAME] [--samples N] [--workers N] [--components] "
+              "[--backend dict|csr] [--cache]")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--source", help="print the degrees of separation from this person")
+    parser.add_argument("--samples", type=int, default=0,
+                        help="number of random sources for the sampled histogram and diameter")
+    parser.add_argument("--seed", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--components", action="store_true", help="print connected component sizes")
+    parser.add_argument("--backend", choices=["dict", "csr"], default="dict")
+    parser.add_argument("--cache", action="store_true")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory, backend=args.backend, cache=args.cache)
+    print("Data loaded.")
+
+    if args.source is not None:
+        source = degrees.person_id_for_name(args.source)
+        if source is None:
+            sys.exit("Person not found.")
+        levels = separation_levels(source)
+        print(f"Degrees of separation from {degrees.people[source]['name']}:")
+        print_histogram(levels)
+        print(f"    unreachable: {len(degrees.people) - sum(levels.values())}")
+
+    if args.components:
+        sizes = component_sizes()
+        print(f"{len(sizes)} connected components, largest {sizes[0] if sizes else 0} people")
+        for size, count in sorted(Counter(sizes).items(), reverse=True)[:10]:
+            print(f"    {count} of size {size}")
+
+    if args.samples > 0:
+        def progress(done, total):
+            print(f"\r{done}/{total} sources", end="", file=sys.stderr, flush=True)
+
+        histogram, diameter = sampled_statistics(args.samples, args.workers, args.seed, progress)
+        print(file=sys.stderr)
+        print(f"Degrees of separation over {args.samples} sampled sources:")
+        print_histogram(histogram)
+        print(f"Approximate diameter: {diameter}")
+
+
+def print_histogram(histogram):
+    total = sum(histogram.values())
+    for distance in sorted(histogram):
+        print(f"    {distance}: {histogram[distance]} ({histogram[distance] / total:.2%})")
+
+
+class Adjacency():
+    """
+    Person and movie adjacency of whichever backend degrees loaded.
+    People are the CSR numbers with the csr backend and person_ids otherwise.
+    """
+
+    def __init__(self):
+        graph = degrees.graph
+        if graph is not None:
+            self.people = range(len(graph.person_ids))
+            self.movies_for_person = graph.movies_for_person
+            self.stars_for_movie = graph.stars_for_movie
+            self.number = graph.person_number.__getitem__
+        else:
+            self.people = degrees.people
+            self.movies_for_person = lambda person_id: degrees.people[person_id]["movies"]
+            self.stars_for_movie = lambda movie_id: degrees.movies[movie_id]["stars"]
+            self.number = lambda person_id: person_id
+
+    def levels(self, source, visited=None):
+        """
+        Runs a breadth first search from source, yielding the people found on each level.
+        People already in visited are skipped, and everyone reached is added to it.
+        """
+        if visited is None:
+            visited = set()
+        visited.add(source)
+        moviesSeen = set()
+        level = [source]
+        while level:
+            yield level
+            nextLevel = []
+            for person in level:
+                for movie in self.movies_for_person(person):
+                    # Every star of a movie is reached the first time the movie is seen
+                    if movie in moviesSeen:
+                        continue
+                    moviesSeen.add(movie)
+                    for star in self.stars_for_movie(movie):
+                        if star not in visited:
+                            visited.add(star)
+                            nextLevel.append(star)
+            level = nextLevel
+
+
+def separation_levels(source):
+    """
+    Returns a dictionary mapping each degree of separation from the
+    person_id source to the number of people at that degree.
+    """
+    adjacency = Adjacency()
+    return {distance: len(level)
+            for distance, level in enumerate(adjacency.levels(adjacency.number(source)))}
+
+
+def component_sizes():
+    """
+    Returns the sizes of the connected components of the actor graph, largest first.
+    """
+    adjacency = Adjacency()
+    visited = set()
+    sizes = []
+    for person in adjacency.people:
+        if person not in visited:
+            sizes.append(sum(len(level) for level in adjacency.levels(person, visited)))
+    sizes.sort(reverse=True)
+    return sizes
+
+
+def eccentricity(person):
+    """
+    Returns the separation histogram of a person, in Adjacency numbering,
+    along with the person farthest away from them.
+    """
+    histogram = {}
+    farthest = person
+    for distance, level in enumerate(Adjacency().levels(person)):
+        histogram[distance] = len(level)
+        farthest = level[0]
+    return histogram, farthest
+
+
+def sampled_statistics(samples, workers, seed=50, progress=None):
+    """
+    Estimates the separation histogram and the diameter of the actor graph
+    from a breadth first search of randomly sampled sources.
+
+    Each sample is followed by a second search from the person farthest from it
+    (a double sweep), which tightens the diameter lower bound.
+    progress, if given, is called with (done, total) after each search.
+    Returns (histogram, diameter).
+    """
+    adjacency = Adjacency()
+    people = list(adjacency.people)
+    rng = random.Random(seed)
+    sources = [rng.choice(people) for _ in range(min(samples, len(people)))]
+
+    histogram = Counter()
+    diameter = 0
+    total = 2 * len(sources)
+    done = 0
+
+    with processMap(workers) as mapper:
+        farthest = []
+        for levels, person in mapper(eccentricity, sources):
+            histogram.update(levels)
+            farthest.append(person)
+            diameter = max(diameter, max(levels))
+            done += 1
+            if progress is not None:
+                progress(done, total)
+
+        # The sweeps only tighten the diameter, they are not part of the random sample
+        for levels, _ in mapper(eccentricity, farthest):
+            diameter = max(diameter, max(levels))
+            done += 1
+            if progress is not None:
+                progress(done, total)
+
+    # Distance 0 is the source itself
+    histogram.pop(0, None)
+    return dict(histogram), diameter
+
+
+""" 
+    Gives an unordered map over a forked process pool, the workers inherit the loaded data.
+    Falls back to the builtin map with a single worker or when fork is unavailable
+"""
+@contextmanager
+def processMap(workers):
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        yield map
+        return
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        yield pool.imap_unordered
+
+
+if __name__ == "__main__":
+    main()
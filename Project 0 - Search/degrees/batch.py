@@ -0,0 +1,130 @@
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import degrees
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python batch.py [directory] [--input FILE] [--workers N] [--backend dict|csr] [--cache] [--bidirectional]")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--input", default="-",
+                        help="file with one tab separated pair of names per line, - for stdin")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--backend", choices=["dict", "csr"], default="dict")
+    parser.add_argument("--cache", action="store_true")
+    parser.add_argument("--bidirectional", action="store_true")
+    args = parser.parse_args()
+
+    # The dataset is loaded once, the workers forked afterwards share it copy-on-write
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, backend=args.backend, cache=args.cache)
+    print("Data loaded.", file=sys.stderr)
+
+    f = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    with f:
+        queries = [(source, target, args.bidirectional) for source, target in read_pairs(f)]
+
+    latencies = []
+    for answer in run_queries(queries, args.workers):
+        latencies.append(answer["latency_ms"])
+        print(json.dumps(answer), flush=True)
+
+    report_latencies(latencies)
+
+
+def read_pairs(f):
+    """
+    Yields (source, target) name pairs, one per non-empty line.
+    Names are separated by a tab, or by a comma when the line has no tab.
+    """
+    for line in f:
+        line = line.strip()
+        if not line:
+            continue
+        separator = "\t" if "\t" in line else ","
+        source, _, target = line.partition(separator)
+        yield source.strip(), target.strip()
+
+
+def run_queries(queries, workers):
+    """
+    Yields the answer of every (source, target, bidirectional) query, in input order.
+    With more than one worker the queries run in a forked process pool.
+    """
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        yield from map(answer_query, queries)
+        return
+
+    # Fork is required, the workers rely on inheriting the loaded data instead of reloading it
+    with multiprocessing.get_context("fork").Pool(workers) as pool:
+        yield from pool.imap(answer_query, queries, chunksize=16)
+
+
+def answer_query(query):
+    """
+    Answers one query without any prompts, returning a JSON serializable dictionary.
+    """
+    source_name, target_name, bidirectional = query
+    answer = {"source": source_name, "target": target_name}
+    start = time.perf_counter()
+
+    source, error = resolve_name(source_name)
+    if error is None:
+        target, error = resolve_name(target_name)
+    if error is not None:
+        answer["error"] = error
+    else:
+        path = degrees.cached_shortest_path(source, target, bidirectional=bidirectional)
+        if path is None:
+            answer["degrees"] = None
+        else:
+            answer["degrees"] = len(path)
+            answer["path"] = [
+                {
+                    "movie_id": movie_id,
+                    "movie": degrees.movies[movie_id]["title"],
+                    "person_id": person_id,
+                    "person": degrees.people[person_id]["name"]
+                }
+                for movie_id, person_id in path
+            ]
+
+    answer["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return answer
+
+
+def resolve_name(name):
+    """
+    Non interactive version of degrees.person_id_for_name.
+    Returns (person_id, None), or (None, error) when the name is unknown or ambiguous.
+    """
+    person_ids = sorted(degrees.names.get(name.lower(), set()))
+    if len(person_ids) == 0:
+        return None, f"person not found: {name}"
+    elif len(person_ids) > 1:
+        return None, f"ambiguous name: {name} matches ids {', '.join(person_ids)}"
+    return person_ids[0], None
+
+
+def report_latencies(latencies):
+    """
+    Prints latency percentiles of the answered queries to stderr.
+    """
+    if not latencies:
+        print("No queries.", file=sys.stderr)
+        return
+    latencies = sorted(latencies)
+    summary = ", ".join(
+        f"p{percentile} {latencies[min(len(latencies) - 1, len(latencies) * percentile // 100)]:.2f}ms"
+        for percentile in (50, 90, 99)
+    )
+    print(f"{len(latencies)} queries: {summary}, max {latencies[-1]:.2f}ms", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
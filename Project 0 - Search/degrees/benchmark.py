@@ -0,0 +1,130 @@
+import argparse
+import random
+import time
+import tracemalloc
+
+import degrees
+from nameindex import NameIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(usage="python benchmark.py [directory] [--queries N] [--seed S] [--backends] [--names]")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=50)
+    parser.add_argument("--backends", action="store_true",
+                        help="also report memory and latency of the dict and csr backends")
+    parser.add_argument("--names", action="store_true",
+                        help="also report build time, memory and lookup latency of the name index")
+    args = parser.parse_args()
+
+    print("Loading data...")
+    degrees.load_data(args.directory)
+    print("Data loaded.")
+
+    # Pick the same random pairs for every strategy
+    rng = random.Random(args.seed)
+    person_ids = sorted(degrees.people)
+    pairs = [(rng.choice(person_ids), rng.choice(person_ids)) for _ in range(args.queries)]
+
+    compare_searches(pairs)
+    if args.names:
+        measure_name_index(rng, args.queries)
+    if args.backends:
+        compare_backends(args.directory, pairs)
+
+
+def compare_searches(pairs):
+    """
+    Runs every query with the one-sided and the bidirectional BFS,
+    checking both find paths of the same length and printing the totals.
+    """
+    totals = {}
+    for name, bidirectional in [("bfs", False), ("bidirectional", True)]:
+        expanded = 0
+        lengths = []
+        start = time.perf_counter()
+        for source, target in pairs:
+            path = degrees.shortest_path(source, target, bidirectional=bidirectional)
+            expanded += degrees.stats["expanded"]
+            lengths.append(None if path is None else len(path))
+        totals[name] = (expanded, time.perf_counter() - start, lengths)
+
+    if totals["bfs"][2] != totals["bidirectional"][2]:
+        raise Exception("searches disagree on path lengths")
+
+    print(f"{len(pairs)} queries")
+    for name, (expanded, elapsed, _) in totals.items():
+        print(f"{name:>14}: {expanded} nodes expanded, {elapsed:.3f}s")
+
+
+def compare_backends(directory, pairs):
+    """
+    Loads the data with each backend, printing the memory it holds,
+    the load time and the query latency for the given pairs.
+    """
+    for backend in ["dict", "csr"]:
+        # Drop the previous backend first so its memory is not counted
+        degrees.graph = None
+        degrees.names.clear()
+        degrees.people.clear()
+        degrees.movies.clear()
+
+        tracemalloc.start()
+        start = time.perf_counter()
+        degrees.load_data(directory, backend=backend)
+        loaded = time.perf_counter() - start
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        latencies = []
+        for source, target in pairs:
+            start = time.perf_counter()
+            degrees.shortest_path(source, target)
+            latencies.append(time.perf_counter() - start)
+        latencies.sort()
+
+        print(f"{backend:>5}: {memory / 2 ** 20:.1f} MiB, loaded in {loaded:.2f}s, "
+              f"query median {latencies[len(latencies) // 2] * 1000:.2f}ms, "
+              f"max {latencies[-1] * 1000:.2f}ms")
+
+
+def measure_name_index(rng, queries):
+    """
+    Builds a fresh name index over the loaded people, printing its build time and memory,
+    then looks up misspelled and truncated names, printing the lookup latency.
+    """
+    tracemalloc.start()
+    start = time.perf_counter()
+    index = NameIndex(degrees.people)
+    built = time.perf_counter() - start
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"name index: {len(index.names)} names, {len(index.trigrams)} trigrams, "
+          f"built in {built:.2f}s, {memory / 2 ** 20:.1f} MiB")
+
+    # Drop a random letter from real names, and cut others short for prefix lookups
+    # Small datasets may have fewer people than queries
+    sample = rng.sample(sorted(degrees.people), min(queries, len(degrees.people)))
+    names = [degrees.people[person_id]["name"] for person_id in sample]
+    typos = []
+    for name in names:
+        i = rng.randrange(len(name))
+        typos.append(name[:i] + name[i + 1:])
+    prefixes = [name[:max(3, len(name) // 2)] for name in names]
+
+    for kind, lookups in [("typo", typos), ("prefix", prefixes)]:
+        latencies = []
+        found = 0
+        for query, name in zip(lookups, names):
+            start = time.perf_counter()
+            candidates = index.search(query, degrees.people)
+            latencies.append(time.perf_counter() - start)
+            found += any(candidate[1] == name for candidate in candidates)
+        latencies.sort()
+        print(f"{kind:>6} lookups: median {latencies[len(latencies) // 2] * 1000:.3f}ms, "
+              f"max {latencies[-1] * 1000:.3f}ms, intended name found {found}/{len(lookups)}")
+
+
+if __name__ == "__main__":
+    main()
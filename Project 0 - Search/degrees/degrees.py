@@ -1,6 +1,10 @@
+import argparse
 import csv
 import sys
-from util import Node, StackFrontier, QueueFrontier
+import snapshot
+from graph import CompactGraph
+from nameindex import NameIndex
+from util import Node, DequeQueueFrontier, PathCache, tree_path
 
 # Maps names to a set of corresponding person_ids
 names = {}
@@ -11,20 +15,66 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Prefix and trigram index over the names, for fuzzy lookups
+name_index = NameIndex()
 
-def load_data(directory):
+# Compact CSR graph of people and movies, only set when loaded with the "csr" backend
+# In that case people and movies hold just the names, births, titles and years
+graph = None
+
+# Shortest paths already found, dropped whenever data is loaded again
+path_cache = PathCache()
+
+# Counters for the last search, used to compare the search strategies
+stats = {"expanded": 0}
+
+
+def load_data(directory, backend="dict", cache=False):
     """
     Load data from CSV files into memory.
+    The "dict" backend keeps the graph as sets of ids inside people and movies,
+    the "csr" backend keeps it in a CompactGraph instead.
+
+    With cache, the parsed data is also written to a binary snapshot next to the
+    CSV files, and later loads read that snapshot until the CSV files change.
     """
+    global names, people, movies, graph, name_index
+    if backend not in ("dict", "csr"):
+        raise ValueError(f"unknown backend {backend}")
+    path_cache.clear()
+
+    if cache:
+        data = snapshot.load(directory, backend)
+        if data is not None:
+            names, people, movies, graph, name_index = data
+            return
+
+    # Start from a clean slate in case data was loaded before
+    names.clear()
+    people.clear()
+    movies.clear()
+    graph = readCsv(directory, backend == "csr")
+    name_index = NameIndex(people)
+
+    if cache:
+        snapshot.save(directory, backend, (names, people, movies, graph, name_index))
+
+
+""" 
+    Parses the CSV files into names, people and movies.
+    Returns the CompactGraph of the stars when compact, otherwise None
+"""
+def readCsv(directory, compact):
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
             people[row["id"]] = {
                 "name": row["name"],
-                "birth": row["birth"],
-                "movies": set()
+                "birth": row["birth"]
             }
+            if not compact:
+                people[row["id"]]["movies"] = set()
             if row["name"].lower() not in names:
                 names[row["name"].lower()] = {row["id"]}
             else:
@@ -36,29 +86,40 @@ def load_data(directory):
         for row in reader:
             movies[row["id"]] = {
                 "title": row["title"],
-                "year": row["year"],
-                "stars": set()
+                "year": row["year"]
             }
+            if not compact:
+                movies[row["id"]]["stars"] = set()
 
     # Load stars
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
+        if compact:
+            edges = ((row["person_id"], row["movie_id"]) for row in reader)
+            return CompactGraph(people.keys(), movies.keys(), edges)
         for row in reader:
             try:
                 people[row["person_id"]]["movies"].add(row["movie_id"])
                 movies[row["movie_id"]]["stars"].add(row["person_id"])
             except KeyError:
                 pass
+    return None
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    parser = argparse.ArgumentParser(usage="python degrees.py [directory] [--bidirectional] [--backend dict|csr] [--cache]")
+    parser.add_argument("directory", nargs="?", default="large")
+    parser.add_argument("--bidirectional", action="store_true",
+                        help="search from both the source and the target")
+    parser.add_argument("--backend", choices=["dict", "csr"], default="dict",
+                        help="in-memory representation of the actor/movie graph")
+    parser.add_argument("--cache", action="store_true",
+                        help="load from a binary snapshot, rebuilding it when the CSV files change")
+    args = parser.parse_args()
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(args.directory, backend=args.backend, cache=args.cache)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -68,7 +129,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = shortest_path(source, target, bidirectional=args.bidirectional)
 
     if path is None:
         print("Not connected.")
@@ -83,14 +144,23 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If bidirectional is True the search grows from both ends and meets in the middle.
 
     If no possible path, returns None.
     """
+    if bidirectional:
+        return shortest_path_bidirectional(source, target)
+    elif graph is not None:
+        path = graph.shortest_path(source, target)
+        stats["expanded"] = graph.expanded
+        return path
+
+    stats["expanded"] = 0
 
     # First we need to identify the source and target by their id's
     # If the source is the same as the target return an empty list
@@ -103,7 +173,7 @@ def shortest_path(source, target):
     # Start the variables to work with
     # state = person_id, parent = previous node, action = movie_id
     start = Node(source, None, None)
-    frontier = QueueFrontier()
+    frontier = DequeQueueFrontier()
     frontier.add(start)
 
     # All explored states so far
@@ -112,6 +182,7 @@ def shortest_path(source, target):
     while not frontier.empty():
         # Grab the first node on the frontier by using remove
         node = frontier.remove()
+        stats["expanded"] += 1
 
         # Add it to the explored states
         explored.add(node.state)
@@ -132,6 +203,120 @@ def shortest_path(source, target):
     return None
 
 
+def cached_shortest_path(source, target, bidirectional=False):
+    """
+    Same as shortest_path, answering from path_cache when possible.
+    People asked for often get a whole BFS parent tree in the cache.
+    """
+    found, path = path_cache.get(source, target)
+    if found:
+        return path
+
+    # The lookup above already counted this query as a miss, so a new tree answers it directly
+    if source in people and path_cache.wants_tree(source):
+        parents = parent_tree(source)
+        path_cache.add_tree(source, parents)
+        path = tree_path(parents, source, target)
+        path_cache.put(source, target, path)
+        return path
+
+    path = shortest_path(source, target, bidirectional=bidirectional)
+    path_cache.put(source, target, path)
+    return path
+
+
+def parent_tree(root):
+    """
+    Returns a dictionary mapping every person reachable from root to the
+    (movie_id, person_id) step of the BFS that reached them, and root to None.
+    """
+    parents = {root: None}
+    frontier = [root]
+    while frontier:
+        nextFrontier = []
+        for person_id in frontier:
+            for movie_id, neighbor in neighbors_for_person(person_id):
+                if neighbor not in parents:
+                    parents[neighbor] = (movie_id, person_id)
+                    nextFrontier.append(neighbor)
+        frontier = nextFrontier
+    return parents
+
+
+def shortest_path_bidirectional(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching from both ends.
+
+    If no possible path, returns None.
+    """
+    stats["expanded"] = 0
+    if source not in people or target not in people:
+        return None
+    elif source == target:
+        return []
+
+    # Each side maps a reached person_id to (movie_id, person_id) of the step that reached it
+    # On the forward side the step points back to the source, on the backward side towards the target
+    forward = {source: None}
+    backward = {target: None}
+    forwardFrontier = [source]
+    backwardFrontier = [target]
+
+    while forwardFrontier and backwardFrontier:
+        # Always grow the smaller frontier, this is what keeps both searches shallow
+        if len(forwardFrontier) <= len(backwardFrontier):
+            forwardFrontier, meetings = expandLevel(forwardFrontier, forward, backward)
+        else:
+            backwardFrontier, meetings = expandLevel(backwardFrontier, backward, forward)
+
+        if meetings:
+            # Every meeting found on this level is a candidate, keep the one with the shortest total path
+            return min((joinPaths(meeting, forward, backward) for meeting in meetings), key=len)
+    return None
+
+
+""" 
+    Expands a whole level of one side of the bidirectional search.
+    Returns the next level and the people that were already reached by the other side
+"""
+def expandLevel(frontier, parents, otherParents):
+    nextFrontier = []
+    meetings = []
+    for person_id in frontier:
+        stats["expanded"] += 1
+        for movie_id, neighbor in neighbors_for_person(person_id):
+            if neighbor in parents:
+                continue
+            parents[neighbor] = (movie_id, person_id)
+            nextFrontier.append(neighbor)
+            if neighbor in otherParents:
+                meetings.append(neighbor)
+    return nextFrontier, meetings
+
+
+""" 
+    Joins the two halves of a bidirectional search at the person where they met
+"""
+def joinPaths(meeting, forward, backward):
+    # Walk back to the source, then reverse
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, previous = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = previous
+    path.reverse()
+
+    # Walk forward to the target
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, following = backward[person_id]
+        path.append((movie_id, following))
+        person_id = following
+    return path
+
+
 """ 
     Reconstruct function that allows to backtrack from the target node to the source node, thus creating 
     the search path 
@@ -150,9 +335,23 @@ def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+    Unknown names are offered the closest matches from name_index instead.
     """
     person_ids = list(names.get(name.lower(), set()))
     if len(person_ids) == 0:
+        candidates = name_index.search(name, people)
+        if not candidates:
+            return None
+        print(f"No '{name}' found. Did you mean:")
+        person_ids = [person_id for person_id, _, _, _ in candidates]
+        for person_id, name, birth, _ in candidates:
+            print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
+        try:
+            person_id = input("Intended Person ID: ")
+            if person_id in person_ids:
+                return person_id
+        except ValueError:
+            pass
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
@@ -177,6 +376,8 @@ def neighbors_for_person(person_id):
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -0,0 +1,129 @@
+from array import array
+from collections import deque
+
+
+class CompactGraph():
+    """
+    Bipartite person/movie graph stored in CSR form.
+
+    Person and movie ids are interned to consecutive integers. The movies of
+    person p are movie_index[person_offsets[p]:person_offsets[p + 1]] and the
+    stars of movie m are star_index[movie_offsets[m]:movie_offsets[m + 1]],
+    so the whole graph lives in four flat integer arrays.
+    """
+
+    def __init__(self, person_ids, movie_ids, edges):
+        """
+        person_ids and movie_ids are the ids as found in the CSV files.
+        edges is an iterable of (person_id, movie_id) pairs, unknown ids are skipped.
+        Repeated edges are harmless, the search never scans a movie twice.
+        """
+        self.person_ids = list(person_ids)
+        self.movie_ids = list(movie_ids)
+        self.person_number = {person_id: i for i, person_id in enumerate(self.person_ids)}
+        self.movie_number = {movie_id: i for i, movie_id in enumerate(self.movie_ids)}
+
+        # Intern the edges first, remembering them as two parallel arrays
+        edgePeople = array("l")
+        edgeMovies = array("l")
+        for person_id, movie_id in edges:
+            p = self.person_number.get(person_id)
+            m = self.movie_number.get(movie_id)
+            if p is None or m is None:
+                continue
+            edgePeople.append(p)
+            edgeMovies.append(m)
+
+        self.person_offsets, self.movie_index = buildCsr(len(self.person_ids), edgePeople, edgeMovies)
+        self.movie_offsets, self.star_index = buildCsr(len(self.movie_ids), edgeMovies, edgePeople)
+
+        # Nodes expanded by the last search
+        self.expanded = 0
+
+    def movies_for_person(self, p):
+        return self.movie_index[self.person_offsets[p]:self.person_offsets[p + 1]]
+
+    def stars_for_movie(self, m):
+        return self.star_index[self.movie_offsets[m]:self.movie_offsets[m + 1]]
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        neighbors = set()
+        for m in self.movies_for_person(self.person_number[person_id]):
+            movie_id = self.movie_ids[m]
+            for q in self.stars_for_movie(m):
+                neighbors.add((movie_id, self.person_ids[q]))
+        return neighbors
+
+    def shortest_path(self, source, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target, or None if they are not connected.
+        """
+        self.expanded = 0
+        if source not in self.person_number or target not in self.person_number:
+            return None
+        elif source == target:
+            return []
+
+        start = self.person_number[source]
+        goal = self.person_number[target]
+
+        # parentPerson[q] and parentMovie[q] record how q was reached, -1 means not reached yet
+        parentPerson = array("l", [-1]) * len(self.person_ids)
+        parentMovie = array("l", [-1]) * len(self.person_ids)
+        # A movie only needs to be scanned once, the first time any of its stars is expanded
+        movieSeen = bytearray(len(self.movie_ids))
+
+        personOffsets, movieIndex = self.person_offsets, self.movie_index
+        movieOffsets, starIndex = self.movie_offsets, self.star_index
+
+        parentPerson[start] = start
+        frontier = deque([start])
+        while frontier:
+            p = frontier.popleft()
+            self.expanded += 1
+            for m in movieIndex[personOffsets[p]:personOffsets[p + 1]]:
+                if movieSeen[m]:
+                    continue
+                movieSeen[m] = 1
+                for q in starIndex[movieOffsets[m]:movieOffsets[m + 1]]:
+                    if parentPerson[q] != -1:
+                        continue
+                    parentPerson[q] = p
+                    parentMovie[q] = m
+                    if q == goal:
+                        return self.reconstruct(q, start, parentPerson, parentMovie)
+                    frontier.append(q)
+        return None
+
+    def reconstruct(self, q, start, parentPerson, parentMovie):
+        # Walk the parent arrays back to the start, translating back to the original ids
+        path = []
+        while q != start:
+            path.append((self.movie_ids[parentMovie[q]], self.person_ids[q]))
+            q = parentPerson[q]
+        path.reverse()
+        return path
+
+
+"""
+    Builds CSR offsets and indices for size rows from parallel arrays of (row, column) edges
+"""
+def buildCsr(size, rows, columns):
+    offsets = array("l", [0]) * (size + 1)
+    for row in rows:
+        offsets[row + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    # Fill each row from its offset onwards
+    indices = array("l", [0]) * len(rows)
+    position = offsets[:-1]
+    for row, column in zip(rows, columns):
+        indices[position[row]] = column
+        position[row] += 1
+    return offsets, indices
@@ -0,0 +1,162 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from difflib import SequenceMatcher
+
+# Only the rarest trigrams of a query are counted, they are the ones that tell names apart
+RARE_TRIGRAMS = 12
+
+# Most names considered per lookup, and most postings read to score them,
+# so a query made only of common trigrams does not touch a large share of all names
+MAX_CANDIDATES = 8000
+MAX_POSTINGS = 16000
+
+# Looking a name up in sorted postings costs about as much as reading this many postings
+LOOKUP_COST = 16
+
+# Fuzzy matches scoring below this are not worth suggesting
+MIN_SCORE = 0.6
+
+
+class NameIndex():
+    """
+    Prefix and trigram index over the names of people, for fuzzy lookups.
+
+    Distinct lowercase names are kept sorted, so a prefix is a bisect away,
+    and every trigram of a padded name maps to the positions of the names containing it.
+    """
+
+    def __init__(self, people=None):
+        self.names = []
+        self.person_ids = []
+        self.trigrams = {}
+        if people:
+            self.build(people)
+
+    def build(self, people):
+        """
+        Indexes the names of a people dictionary as loaded by degrees.load_data.
+        """
+        byName = {}
+        for person_id, person in people.items():
+            byName.setdefault(person["name"].lower(), []).append(person_id)
+
+        self.names = sorted(byName)
+        self.person_ids = [byName[name] for name in self.names]
+        self.trigrams = {}
+        for position, name in enumerate(self.names):
+            for trigram in set(trigrams(name)):
+                postings = self.trigrams.get(trigram)
+                if postings is None:
+                    postings = self.trigrams[trigram] = array("l")
+                postings.append(position)
+
+    def prefix(self, query, limit=10):
+        """
+        Returns up to limit lowercase names starting with query, in alphabetical order.
+        """
+        query = query.lower()
+        matches = []
+        position = bisect_left(self.names, query)
+        while position < len(self.names) and len(matches) < limit and self.names[position].startswith(query):
+            matches.append(self.names[position])
+            position += 1
+        return matches
+
+    def fuzzy(self, query, limit=10):
+        """
+        Returns up to limit (score, name) pairs for the names closest to query, best first.
+        The score is between 0 and 1, with 1 for an exact match.
+        """
+        query = query.lower()
+        first = {}
+        for i, gram in enumerate(trigrams(query)):
+            if gram in self.trigrams:
+                first.setdefault(gram, i)
+        grams = sorted(first, key=lambda gram: len(self.trigrams[gram]))
+        if not grams:
+            return []
+
+        # A typo spoils the trigrams around it, at most three in a row, so of three trigrams
+        # at least three apart two are intact. The name meant holds two of the rarest such three,
+        # or one of the rarest two when the query is too short for three
+        spread = []
+        for gram in grams:
+            if len(spread) < 3 and all(abs(first[gram] - first[other]) >= 3 for other in spread):
+                spread.append(gram)
+        rarest = [set(self.trigrams[gram][:MAX_CANDIDATES // 2]) for gram in spread[:2]]
+        candidates = set().union(*rarest)
+        if len(spread) == 3:
+            candidates = (rarest[0] & rarest[1]).union(intersect(candidates, self.trigrams[spread[2]]))
+
+        # Score the candidates on the rarest trigrams, within the postings budget
+        shared = Counter()
+        total = 0
+        for gram in grams[:RARE_TRIGRAMS]:
+            postings = self.trigrams[gram]
+            total += min(len(postings), len(candidates) * LOOKUP_COST)
+            if total > MAX_POSTINGS:
+                break
+            shared.update(intersect(candidates, postings))
+
+        # Rank the best trigram matches precisely, comparing the whole strings.
+        # The matcher keeps what it learnt about query between names,
+        # and names too long or too short to match are skipped
+        matcher = SequenceMatcher(None)
+        matcher.set_seq2(query)
+        scored = []
+        for position, _ in shared.most_common(limit):
+            name = self.names[position]
+            matcher.set_seq1(name)
+            if matcher.real_quick_ratio() < MIN_SCORE:
+                continue
+            score = matcher.ratio()
+            if score >= MIN_SCORE:
+                scored.append((score, name))
+        scored.sort(key=lambda match: (-match[0], match[1]))
+        return scored[:limit]
+
+    def search(self, query, people, limit=10):
+        """
+        Returns up to limit candidates for query as (person_id, name, birth, score) tuples, best first.
+        Exact matches come first, then names starting with query, then fuzzy matches.
+        """
+        query = query.lower()
+        ranked = {}
+        for name in self.prefix(query, limit):
+            ranked[name] = 1.0 if name == query else 0.99
+        # Prefix matches outrank any fuzzy match, so there is no need to look further once they fill limit
+        if len(ranked) < limit:
+            for score, name in self.fuzzy(query, limit):
+                ranked.setdefault(name, score)
+
+        candidates = []
+        for name, score in sorted(ranked.items(), key=lambda match: (-match[1], match[0])):
+            position = bisect_left(self.names, name)
+            for person_id in self.person_ids[position]:
+                person = people[person_id]
+                candidates.append((person_id, person["name"], person["birth"], round(score, 3)))
+        return candidates[:limit]
+
+
+def intersect(candidates, postings):
+    """
+    Returns the candidate positions found in sorted postings, looking each candidate up
+    when there are far fewer candidates than postings, and reading the postings otherwise.
+    """
+    if len(postings) <= len(candidates) * LOOKUP_COST:
+        return candidates.intersection(postings)
+    found = []
+    for position in candidates:
+        i = bisect_left(postings, position)
+        if i < len(postings) and postings[i] == position:
+            found.append(position)
+    return found
+
+
+def trigrams(text):
+    """
+    Returns the trigrams of text padded with spaces, so short words and word edges count as well.
+    """
+    padded = f"  {text} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
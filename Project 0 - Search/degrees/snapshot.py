@@ -0,0 +1,113 @@
+import copy
+import mmap
+import os
+import pickle
+import sys
+from array import array
+
+# Bumped whenever the layout of the loaded data changes, so old snapshots are rebuilt
+VERSION = 3
+
+# CSR arrays of a CompactGraph, written raw after the pickled data and mapped back without copying
+RAW_ARRAYS = ["person_offsets", "movie_index", "movie_offsets", "star_index"]
+ITEMSIZE = array("l").itemsize
+
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+
+
+def snapshot_path(directory, backend):
+    """
+    Returns the path of the snapshot for a data directory and backend.
+    """
+    return os.path.join(directory, f".degrees-{backend}.snapshot")
+
+
+def fingerprint(directory):
+    """
+    Returns the size and modification time of every CSV file,
+    any change to them means the snapshot is stale.
+    """
+    stamps = []
+    for name in SOURCES:
+        info = os.stat(os.path.join(directory, name))
+        stamps.append((name, info.st_size, info.st_mtime_ns))
+    # The raw arrays are only readable on a machine with the same integer layout
+    return (VERSION, sys.byteorder, ITEMSIZE, tuple(stamps))
+
+
+def load(directory, backend):
+    """
+    Returns the data saved by save for this directory and backend,
+    or None if there is no snapshot or the CSV files changed since it was written.
+    """
+    path = snapshot_path(directory, backend)
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return None
+
+    with f:
+        # The header is unpickled on its own, so a stale snapshot is rejected without reading the rest.
+        # A damaged file can fail to unpickle in many ways, any of them means rebuilding it
+        try:
+            if pickle.load(f) != fingerprint(directory):
+                return None
+            data, lengths = pickle.load(f)
+            if lengths:
+                map_graph(data[3], f, lengths)
+            return data
+        except Exception:
+            return None
+
+
+def map_graph(graph, f, lengths):
+    """
+    Points the CSR arrays of graph at the raw arrays following the pickled data in f.
+    They are read-only views into the mapped file, so pages are only read when a search touches them,
+    and forked workers share them.
+    """
+    offset = f.tell()
+    view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+    for name, length in zip(RAW_ARRAYS, lengths):
+        offset += -offset % ITEMSIZE
+        end = offset + length * ITEMSIZE
+        if end > len(view):
+            raise ValueError("truncated snapshot")
+        setattr(graph, name, view[offset:end].cast("l"))
+        offset = end
+
+
+def save(directory, backend, data):
+    """
+    Writes data to the snapshot for this directory and backend, returning whether it could.
+    The file is replaced atomically so concurrent loads never see half a snapshot.
+    """
+    path = snapshot_path(directory, backend)
+    temporary = f"{path}.{os.getpid()}.tmp"
+
+    # The CSR arrays are left out of the pickle and written raw after it
+    names, people, movies, graph, name_index = data
+    raw = []
+    if graph is not None:
+        raw = [getattr(graph, name) for name in RAW_ARRAYS]
+        graph = copy.copy(graph)
+        for name in RAW_ARRAYS:
+            setattr(graph, name, None)
+
+    try:
+        with open(temporary, "wb") as f:
+            pickle.dump(fingerprint(directory), f, protocol=pickle.HIGHEST_PROTOCOL)
+            pickle.dump(((names, people, movies, graph, name_index), [len(values) for values in raw]),
+                        f, protocol=pickle.HIGHEST_PROTOCOL)
+            for values in raw:
+                f.write(bytes(-f.tell() % ITEMSIZE))
+                f.write(values)
+        os.replace(temporary, path)
+        return True
+    except OSError:
+        # A read-only or full data directory only means going without a snapshot
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+        return False
@@ -1,3 +1,6 @@
+from collections import OrderedDict, deque
+
+
 class Node():
     def __init__(self, state, parent, action):
         self.state = state
@@ -36,3 +39,164 @@ class QueueFrontier(StackFrontier):
             node = self.frontier[0]
             self.frontier = self.frontier[1:]
             return node
+
+
+class DequeStackFrontier():
+    """
+    Stack frontier where add, remove and contains_state are O(1).
+    Nodes live in a deque, and a count of the states on the frontier
+    answers contains_state without scanning.
+    """
+    def __init__(self):
+        self.frontier = deque()
+        self.states = {}
+
+    def add(self, node):
+        self.frontier.append(node)
+        self.states[node.state] = self.states.get(node.state, 0) + 1
+
+    def contains_state(self, state):
+        return state in self.states
+
+    def empty(self):
+        return len(self.frontier) == 0
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            return self.forget(self.frontier.pop())
+
+    def forget(self, node):
+        # The same state may have been added more than once
+        count = self.states[node.state] - 1
+        if count == 0:
+            del self.states[node.state]
+        else:
+            self.states[node.state] = count
+        return node
+
+
+class DequeQueueFrontier(DequeStackFrontier):
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            return self.forget(self.frontier.popleft())
+
+
+class PathCache():
+    """
+    Bounded LRU cache of shortest paths, keyed on the unordered pair of people.
+
+    Paths are stored in one direction only, a lookup for the reversed pair
+    reverses the stored path. Sources that are asked for often can also get a
+    whole BFS parent tree, which answers every target from that source.
+    """
+    def __init__(self, capacity=1024, trees=4, popular=3):
+        self.capacity = capacity
+        self.trees_capacity = trees
+        self.popular = popular
+        self.paths = OrderedDict()
+        self.trees = OrderedDict()
+        self.requests = {}
+
+        # Lookups answered by a path or a tree, and lookups that needed a search.
+        # Evictions are counted separately for paths and for trees
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.tree_hits = 0
+        self.tree_evictions = 0
+
+    def clear(self):
+        """Drops every cached path and tree, the counters are kept."""
+        self.paths.clear()
+        self.trees.clear()
+        self.requests.clear()
+
+    def get(self, source, target):
+        """
+        Returns (True, path) when the path from source to target is known,
+        where path may be None for people that are not connected.
+        Returns (False, None) otherwise.
+        """
+        key = (source, target) if source <= target else (target, source)
+        if key in self.paths:
+            self.paths.move_to_end(key)
+            self.hits += 1
+            path = self.paths[key]
+            if path is None or key[0] == source:
+                return True, path
+            return True, reverse_path(key[0], path)
+
+        for root in (source, target):
+            if root in self.trees:
+                self.trees.move_to_end(root)
+                self.hits += 1
+                self.tree_hits += 1
+                path = tree_path(self.trees[root], source, target)
+                self.put(source, target, path)
+                return True, path
+
+        self.misses += 1
+        return False, None
+
+    def put(self, source, target, path):
+        key = (source, target) if source <= target else (target, source)
+        if key[0] != source and path is not None:
+            path = reverse_path(source, path)
+        self.paths[key] = path
+        self.paths.move_to_end(key)
+        if len(self.paths) > self.capacity:
+            self.paths.popitem(last=False)
+            self.evictions += 1
+
+    def wants_tree(self, source):
+        """
+        Records a request from source, returning True once it is popular
+        enough to deserve a parent tree.
+        """
+        self.requests[source] = self.requests.get(source, 0) + 1
+        return self.requests[source] >= self.popular and source not in self.trees
+
+    def add_tree(self, root, parents):
+        """
+        Stores a BFS parent tree, mapping every person reachable from root
+        to the (movie_id, person_id) step that reached it, and root to None.
+        """
+        self.trees[root] = parents
+        if len(self.trees) > self.trees_capacity:
+            self.trees.popitem(last=False)
+            self.tree_evictions += 1
+
+
+def reverse_path(source, path):
+    """
+    Reverses a list of (action, state) steps that starts at source.
+    """
+    states = [source] + [state for _, state in path]
+    return [(path[i][0], states[i]) for i in range(len(path) - 1, -1, -1)]
+
+
+def tree_path(parents, source, target):
+    """
+    Returns the path from source to target through a parent tree rooted at one of them,
+    or None if the other one is not in the tree.
+    """
+    end = target if parents.get(source, ()) is None else source
+    if end not in parents:
+        return None
+
+    # Walk from the far end up to the root
+    steps = []
+    while parents[end] is not None:
+        action, parent = parents[end]
+        steps.append((action, end))
+        end = parent
+    steps.reverse()
+    if end == source:
+        return steps
+    # The tree is rooted at the target, so the walk went from the target's side
+    return reverse_path(target, steps)
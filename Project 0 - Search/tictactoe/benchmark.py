@@ -0,0 +1,117 @@
+import math
+import os
+import time
+
+import bitboard
+import book
+import tictactoe as ttt
+
+
+def main():
+    board = ttt.initial_state()
+
+    # The book is read from disk on the first lookup
+    book.table = None
+    start = time.perf_counter()
+    move = book.lookup(board)
+    elapsed = time.perf_counter() - start
+    print(f"    book: {move} from an empty board in {elapsed * 1000:.2f}ms, {len(book.table)} positions")
+
+    # Time the searches themselves
+    ttt.USE_BOOK = False
+    for engine in ["classic", "bitboard"]:
+        ttt.ENGINE = engine
+        bitboard.table.clear()
+        start = time.perf_counter()
+        move = ttt.minimax(board)
+        elapsed = time.perf_counter() - start
+        print(f"{engine:>8}: {move} from an empty board in {elapsed * 1000:.2f}ms")
+
+    # A second search on the bitboard engine only reads the transposition table
+    start = time.perf_counter()
+    ttt.minimax(board)
+    print(f"    warm: {(time.perf_counter() - start) * 1000:.2f}ms, {len(bitboard.table)} boards in the table")
+
+    compare_refinements()
+    check_agreement()
+    compare_workers()
+
+
+def compare_refinements():
+    """
+    Prints the nodes visited and cutoffs taken by the classic search from an empty board,
+    with and without symmetry pruning and move ordering.
+    """
+    ttt.ENGINE = "classic"
+    for pruning, ordering in [(False, False), (True, False), (False, True), (True, True)]:
+        ttt.SYMMETRY_PRUNING = pruning
+        ttt.MOVE_ORDERING = ordering
+        start = time.perf_counter()
+        ttt.minimax(ttt.initial_state())
+        elapsed = time.perf_counter() - start
+        print(f"symmetry pruning {'on ' if pruning else 'off'}, move ordering {'on ' if ordering else 'off'}: "
+              f"{ttt.stats['nodes']} nodes, {ttt.stats['cutoffs']} cutoffs, {elapsed * 1000:.2f}ms")
+
+
+def check_agreement():
+    """
+    Plays every game where one player follows the engines and the other tries every reply,
+    checking both engines always pick moves of the same value.
+    """
+    def value(board):
+        return bitboard.value(*bitboard.encode(board))
+
+    boards = [(ttt.initial_state(), ttt.X), (ttt.initial_state(), ttt.O)]
+    checked = 0
+    while boards:
+        board, ai = boards.pop()
+        if ttt.terminal(board):
+            continue
+        ttt.ENGINE = "classic"
+        classic = ttt.minimax(board)
+        ttt.ENGINE = "bitboard"
+        fast = ttt.minimax(board)
+        if value(ttt.result(board, classic)) != value(ttt.result(board, fast)):
+            raise Exception(f"engines disagree on {board}")
+        checked += 1
+        if ttt.player(board) == ai:
+            boards.append((ttt.result(board, fast), ai))
+        else:
+            boards.extend((ttt.result(board, action), ai) for action in ttt.actions(board))
+    print(f"engines agree on {checked} boards")
+
+
+def compare_workers(depth=4):
+    """
+    Times a fixed depth search of a 5x5 board with 4 in a row, splitting the root moves
+    across 1, 2, 4 and 8 workers, and checks every split picks the sequential move.
+    """
+    ttt.WIN_LENGTH = 4
+    board = ttt.initial_state(5, 5)
+    board[2][2] = ttt.X
+    board[1][2] = ttt.O
+    print(f"5x5, 4 in a row, depth {depth}, {os.cpu_count()} cores")
+
+    start = time.perf_counter()
+    sequential = ttt.depthLimitedValue(board, ttt.player(board), depth, -math.inf, math.inf, math.inf)
+    baseline = time.perf_counter() - start
+    print(f"  sequential: {sequential[1]} in {baseline:.2f}s")
+
+    for workers in [1, 2, 4, 8]:
+        if workers == 1:
+            start = time.perf_counter()
+            parallel = ttt.depthLimitedValue(board, ttt.player(board), depth, -math.inf, math.inf, math.inf)
+        else:
+            # Start the pool before timing, a real game reuses it for every move
+            ttt.workerPool(workers)
+            start = time.perf_counter()
+            parallel = ttt.parallelSearch(board, depth, workers)
+        elapsed = time.perf_counter() - start
+        if parallel != sequential:
+            raise Exception(f"{workers} workers picked {parallel} instead of {sequential}")
+        print(f"  {workers} workers: {elapsed:.2f}s, speedup {baseline / elapsed:.2f}x")
+    ttt.WIN_LENGTH = 3
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Bitboard Tic Tac Toe engine
+
+The board is two 9-bit integers, one for the cells taken by X and one for O.
+Bit 3 * i + j stands for the cell (i, j).
+"""
+
+X = "X"
+O = "O"
+
+FULL = 0b111111111
+
+# Every row, column and diagonal as a mask of its three cells
+LINES = [
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100,
+]
+
+# Values of boards already searched, keyed on (xBits, oBits). X to move is implied by the counts
+table = {}
+
+
+def encode(board):
+    """
+    Returns (xBits, oBits) for a 3x3 list board.
+    """
+    xBits = 0
+    oBits = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                xBits |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                oBits |= 1 << (3 * i + j)
+    return xBits, oBits
+
+
+def won(bits):
+    """
+    Returns True if the cells in bits complete any line.
+    """
+    for line in LINES:
+        if bits & line == line:
+            return True
+    return False
+
+
+def value(xBits, oBits):
+    """
+    Returns the minimax value of a board: 1 if X wins with perfect play, -1 if O does, 0 for a tie.
+    """
+    key = (xBits, oBits)
+    known = table.get(key)
+    if known is not None:
+        return known
+
+    if won(xBits):
+        result = 1
+    elif won(oBits):
+        result = -1
+    elif xBits | oBits == FULL:
+        result = 0
+    else:
+        xToMove = bin(xBits).count("1") == bin(oBits).count("1")
+        free = FULL & ~(xBits | oBits)
+        if xToMove:
+            result = -1
+            while free and result < 1:
+                move = free & -free
+                free ^= move
+                result = max(result, value(xBits | move, oBits))
+        else:
+            result = 1
+            while free and result > -1:
+                move = free & -free
+                free ^= move
+                result = min(result, value(xBits, oBits | move))
+
+    table[key] = result
+    return result
+
+
+def best_move(board):
+    """
+    Returns the optimal action (i, j) for the player to move on a 3x3 list board,
+    or None if the game is over. Ties go to the lowest cell.
+    """
+    xBits, oBits = encode(board)
+    if won(xBits) or won(oBits) or xBits | oBits == FULL:
+        return None
+
+    xToMove = bin(xBits).count("1") == bin(oBits).count("1")
+    bestValue = None
+    bestCell = None
+    for cell in range(9):
+        move = 1 << cell
+        if (xBits | oBits) & move:
+            continue
+        if xToMove:
+            moveValue = value(xBits | move, oBits)
+            better = bestValue is None or moveValue > bestValue
+        else:
+            moveValue = value(xBits, oBits | move)
+            better = bestValue is None or moveValue < bestValue
+        if better:
+            bestValue = moveValue
+            bestCell = cell
+    return divmod(bestCell, 3)
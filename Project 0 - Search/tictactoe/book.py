@@ -0,0 +1,160 @@
+"""
+Perfect play opening book for 3x3 Tic Tac Toe
+
+Every reachable position is reduced to its canonical form under the 8 symmetries
+of the board, and the book stores one optimal move per canonical position.
+Run this file to write the book next to it:
+
+    python book.py
+"""
+
+import os
+import struct
+
+import bitboard
+
+X = "X"
+O = "O"
+
+PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+MAGIC = b"TTTB"
+
+# The 8 symmetries of the board as permutations: the cell at index k of the
+# transformed board comes from cell SYMMETRIES[s][k] of the original one
+SYMMETRIES = [
+    tuple(3 * i + j for i in range(3) for j in range(3)),              # identity
+    tuple(3 * (2 - j) + i for i in range(3) for j in range(3)),        # rotate 90
+    tuple(3 * (2 - i) + (2 - j) for i in range(3) for j in range(3)),  # rotate 180
+    tuple(3 * j + (2 - i) for i in range(3) for j in range(3)),        # rotate 270
+    tuple(3 * i + (2 - j) for i in range(3) for j in range(3)),        # mirror left to right
+    tuple(3 * (2 - i) + j for i in range(3) for j in range(3)),        # mirror top to bottom
+    tuple(3 * j + i for i in range(3) for j in range(3)),              # main diagonal
+    tuple(3 * (2 - j) + (2 - i) for i in range(3) for j in range(3)),  # secondary diagonal
+]
+
+# Moves of the positions read from disk, keyed on canonical code. None until loaded
+table = None
+
+
+def code(cells):
+    """
+    Returns the base 3 number of a tuple of 9 cells, with 0 empty, 1 X and 2 O.
+    """
+    number = 0
+    for cell in reversed(cells):
+        number = number * 3 + cell
+    return number
+
+
+def cells_for(board):
+    return tuple(1 if mark == X else 2 if mark == O else 0 for row in board for mark in row)
+
+
+def canonical(cells):
+    """
+    Returns (code, symmetry) for the smallest code among the 8 symmetric versions of cells.
+    """
+    return min((code(tuple(cells[k] for k in symmetry)), s) for s, symmetry in enumerate(SYMMETRIES))
+
+
+def best_cell(cells):
+    """
+    Returns the cell index of an optimal move, the lowest one among equals,
+    or None if the game is over.
+    """
+    marks = [None, X, O]
+    board = [[marks[cells[3 * i + j]] for j in range(3)] for i in range(3)]
+    move = bitboard.best_move(board)
+    if move is None:
+        return None
+    return 3 * move[0] + move[1]
+
+
+def build():
+    """
+    Returns a dictionary mapping the canonical code of every reachable
+    non-terminal position to the cell of an optimal move in that canonical form.
+    """
+    book = {}
+    seen = set()
+    stack = [(0,) * 9]
+    while stack:
+        cells = stack.pop()
+        key, s = canonical(cells)
+        if key in seen:
+            continue
+        seen.add(key)
+
+        # Search the canonical form itself so the stored cell needs no translation
+        canonicalCells = tuple(cells[k] for k in SYMMETRIES[s])
+        cell = best_cell(canonicalCells)
+        if cell is None:
+            continue
+        book[key] = cell
+
+        mark = 1 if canonicalCells.count(1) == canonicalCells.count(2) else 2
+        for k in range(9):
+            if canonicalCells[k] == 0:
+                stack.append(canonicalCells[:k] + (mark,) + canonicalCells[k + 1:])
+    return book
+
+
+def save(book, path=PATH):
+    """
+    Writes the book as a magic header, the number of entries, the sorted codes
+    as little endian 16-bit integers and one byte per move.
+    """
+    keys = sorted(book)
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<H", len(keys)))
+        f.write(struct.pack(f"<{len(keys)}H", *keys))
+        f.write(bytes(book[key] for key in keys))
+
+
+def load(path=PATH):
+    """
+    Reads a book written by save, returning None if there is none or it is damaged.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if data[:4] != MAGIC or len(data) < 6:
+        return None
+    count, = struct.unpack_from("<H", data, 4)
+    if len(data) != 6 + 3 * count:
+        return None
+    keys = struct.unpack_from(f"<{count}H", data, 6)
+    moves = data[6 + 2 * count:]
+    return dict(zip(keys, moves))
+
+
+def lookup(board):
+    """
+    Returns the book move (i, j) for a 3x3 list board, or None if there is no book
+    or the position is not in it. The book is read from disk on the first call.
+    """
+    global table
+    if table is None:
+        table = load() or {}
+
+    key, s = canonical(cells_for(board))
+    cell = table.get(key)
+    if cell is None:
+        return None
+
+    # The stored cell is in the canonical frame, map it back to the board as given
+    original = SYMMETRIES[s][cell]
+    return divmod(original, 3)
+
+
+def main():
+    book = build()
+    save(book)
+    print(f"Wrote {len(book)} positions to {PATH} ({os.path.getsize(PATH)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
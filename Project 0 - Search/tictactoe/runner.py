@@ -1,9 +1,34 @@
+import argparse
+import multiprocessing
 import pygame
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
 
+parser = argparse.ArgumentParser(
+    usage="python runner.py [--rows N] [--cols N] [--win-length K] [--time-limit SECONDS] [--workers N]")
+parser.add_argument("--rows", type=int, default=3)
+parser.add_argument("--cols", type=int, default=3)
+parser.add_argument("--win-length", type=int, default=3, help="marks in a row needed to win")
+parser.add_argument("--time-limit", type=float, default=1.0, help="seconds the AI may think on larger boards")
+parser.add_argument("--workers", type=int, default=1, help="processes the AI search is split across")
+args = parser.parse_args()
+rows = args.rows
+cols = args.cols
+ttt.WIN_LENGTH = args.win_length
+ttt.TIME_LIMIT = args.time_limit
+ttt.WORKERS = args.workers
+
+# Without fork the workers would start by running this script again, window and all
+if args.workers > 1 and "fork" not in multiprocessing.get_all_start_methods():
+    parser.error("--workers above 1 needs the fork start method, which this platform lacks")
+
+# Start the search processes before pygame and the AI thread exist, forking from a thread is unsafe
+if args.workers > 1:
+    ttt.workerPool(args.workers)
+
 pygame.init()
 width = 600
 height = 400
@@ -17,11 +42,33 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Shrink the tiles so larger boards still fit under the title
+tile_size = min(80, (height - 120) // rows, (width - 40) // cols)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
+smallFont = pygame.font.Font("OpenSans-Regular.ttf", 16)
+
+# The AI thinks in a background thread so the window keeps rendering meanwhile
+FPS = 60
+MIN_THINK_TIME = 0.5
+clock = pygame.time.Clock()
+executor = ThreadPoolExecutor(max_workers=1)
+
+
+def timed_minimax(board):
+    """
+    Runs the AI search, returning its move and the seconds it took.
+    """
+    start = time.perf_counter()
+    move = ttt.minimax(board)
+    return move, time.perf_counter() - start
+
 
 user = None
-board = ttt.initial_state()
-ai_turn = False
+board = ttt.initial_state(rows, cols)
+ai_future = None
+ai_started = None
+ai_last_time = None
 
 while True:
 
@@ -69,13 +116,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (cols / 2 * tile_size),
+                       height / 2 - (rows / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(rows):
             row = []
-            for j in range(3):
+            for j in range(cols):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -103,6 +149,8 @@ while True:
                 title = f"Game Over: {winner} wins."
         elif user == player:
             title = f"Play as {user}"
+        elif ai_started is not None:
+            title = f"Computer thinking... {time.perf_counter() - ai_started:.1f}s"
         else:
             title = f"Computer thinking..."
         title = largeFont.render(title, True, white)
@@ -110,22 +158,32 @@ while True:
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
+        # Show how long the last AI search took, and that the frame rate holds while it runs
+        if ai_last_time is not None:
+            timing = smallFont.render(f"Last AI search: {ai_last_time:.3f}s", True, white)
+            screen.blit(timing, (10, height - 25))
+        fps = smallFont.render(f"{clock.get_fps():.0f} fps", True, white)
+        screen.blit(fps, (width - fps.get_width() - 10, height - 25))
+
         # Check for AI move
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if ai_future is None:
+                ai_started = time.perf_counter()
+                ai_future = executor.submit(timed_minimax, [row[:] for row in board])
+            elif ai_future.done():
+                # Keep the move on hold for a moment so quick answers do not look instant
+                if time.perf_counter() - ai_started >= MIN_THINK_TIME:
+                    move, ai_last_time = ai_future.result()
+                    board = ttt.result(board, move)
+                    ai_future = None
+                    ai_started = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(rows):
+                for j in range(cols):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -142,7 +200,10 @@ while True:
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
                     user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+                    board = ttt.initial_state(rows, cols)
+                    # A search still running belongs to the old game, its move is dropped
+                    ai_future = None
+                    ai_started = None
 
     pygame.display.flip()
+    clock.tick(FPS)
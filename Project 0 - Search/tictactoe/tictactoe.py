@@ -3,21 +3,52 @@ Tic Tac Toe Player
 """
 
 import math
+import multiprocessing
+import time
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
 from copy import deepcopy
+from functools import lru_cache
+
+import bitboard
+import book
 
 # All the possible choices for player.
 X = "X"
 O = "O"
 EMPTY = None
 
+# Search engine used by minimax. "bitboard" uses the bitboard engine with its transposition table,
+# "classic" the alpha-beta search over list boards below
+ENGINE = "bitboard"
+
+# Answer 3x3 positions from the opening book written by book.py, when there is one
+USE_BOOK = True
+
+# Search refinements of minimaxValue: skipping moves symmetric to ones already searched,
+# and trying killer moves, then the center, corners and edges first
+SYMMETRY_PRUNING = True
+MOVE_ORDERING = True
+
+# Counters of the last minimaxValue search
+stats = {"nodes": 0, "cutoffs": 0}
+
+# Moves that caused a cutoff, per ply, tried first by their sibling positions
+killers = {}
+
+# Number of marks in a row needed to win. Boards other than 3x3 with 3 in a row
+# are searched with iterative deepening, stopping after TIME_LIMIT seconds
+WIN_LENGTH = 3
+TIME_LIMIT = 1.0
+
+# Processes the depth limited search splits its root moves across. 1 searches in this process
+WORKERS = 1
 
-def initial_state():
+
+def initial_state(rows=3, cols=3):
     """
-    Returns starting state of the board. Defined as 3 rows with 3 columns each
+    Returns starting state of the board. Defined as 3 rows with 3 columns each by default
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * cols for _ in range(rows)]
 
 
 def player(board):
@@ -82,11 +113,11 @@ def winner(board):
     Returns the winner of the game, if there is one.
     """
 
-    # Check if any has won horizontally
-    for row in range(len(board)):
+    # Check every row, column and diagonal stretch of WIN_LENGTH cells
+    for line in winningLines(len(board), len(board[0]), WIN_LENGTH):
         numberX = 0
         numberO = 0
-        for col in range(len(board[0])):
+        for row, col in line:
             if board[row][col] == X:
                 numberX = numberX + 1
             elif board[row][col] == O:
@@ -96,55 +127,32 @@ def winner(board):
         if result is not None:
             return result
 
-    # Check if any has won vertically. Fixing a column number and modifying the row.
-    for col in range(len(board[0])):
-        numberX = 0
-        numberO = 0
-        for row in range(len(board)):
-            if board[row][col] == X:
-                numberX = numberX + 1
-            elif board[row][col] == O:
-                numberO = numberO + 1
-
-        result = handleCountPlayer(numberX, numberO)
-        if result is not None:
-            return result
-
-    # Check if any has won on the main diagonal
-    numberX = 0
-    numberO = 0
-    for i in range(len(board)):
-        if board[i][i] == X:
-            numberX = numberX + 1
-        elif board[i][i] == O:
-            numberO = numberO + 1
-
-    result = handleCountPlayer(numberX, numberO)
-    if result is not None:
-        return result
-
-    # Check if any has won on the secondary diagonal
-    numberX = 0
-    numberO = 0
-    for i in range(len(board)):
-        j = len(board) - 1 - i
-        if board[i][j] == X:
-            numberX = numberX + 1
-        elif board[i][j] == O:
-            numberO = numberO + 1
-
-    result = handleCountPlayer(numberX, numberO)
-    if result is not None:
-        return result
-
     # If we reach this deep then no winner has yet been declared
     return None
 
 
+""" 
+Returns every stretch of winLength cells in a row, column or diagonal of a rows x cols board.
+Each stretch is a tuple of (row, col) cells
+"""
+@lru_cache(maxsize=None)
+def winningLines(rows, cols, winLength):
+    lines = []
+    for row in range(rows):
+        for col in range(cols):
+            # Horizontal, vertical, main diagonal and secondary diagonal starting at this cell
+            for dRow, dCol in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                endRow = row + dRow * (winLength - 1)
+                endCol = col + dCol * (winLength - 1)
+                if 0 <= endRow < rows and 0 <= endCol < cols:
+                    lines.append(tuple((row + dRow * k, col + dCol * k) for k in range(winLength)))
+    return tuple(lines)
+
+
 def handleCountPlayer(numberX, numberO):
-    if numberX == 3:
+    if numberX == WIN_LENGTH:
         return X
-    elif numberO == 3:
+    elif numberO == WIN_LENGTH:
         return O
     return None
 
@@ -180,8 +188,23 @@ def minimax(board):
     if terminal(board):
         return None
 
+    classicBoard = len(board) == 3 and len(board[0]) == 3 and WIN_LENGTH == 3
+    if not classicBoard:
+        return deepeningSearch(board, TIME_LIMIT, WORKERS)
+
+    if USE_BOOK:
+        move = book.lookup(board)
+        if move is not None:
+            return move
+
+    if ENGINE == "bitboard":
+        return bitboard.best_move(board)
+
     # Do a loop that sees into the future for all possible moves
     # optimalResult -> (value, action)
+    stats["nodes"] = 0
+    stats["cutoffs"] = 0
+    killers.clear()
     optimalResult = minimaxValue(board, alpha=-math.inf, beta=math.inf)
     return optimalResult[1]
 
@@ -190,7 +213,9 @@ def minimax(board):
 Calculates the best value and action for the minimax function 
 Returns a tuple of (value, action) representing the value obtained from following said action
 """
-def minimaxValue(board, alpha, beta):
+def minimaxValue(board, alpha, beta, ply=0):
+    stats["nodes"] += 1
+
     # Define the players. X is max, O is min
     currentPlayer = player(board)
 
@@ -205,11 +230,11 @@ def minimaxValue(board, alpha, beta):
         bestValue = -math.inf
         bestAction = None
         # Iterate through every possible scenario
-        for action in actions(board):
+        for action in searchActions(board, ply):
             # Get the new board as the result from the action
             newBoard = result(board, action)
             # Calculate the best action and best value. No depth limit means the AI will check all possible options -> Hard to beat
-            value, _ = minimaxValue(newBoard, alpha, beta)
+            value, _ = minimaxValue(newBoard, alpha, beta, ply + 1)
             # Get the new best value and action
             if value > bestValue:
                 bestValue = value
@@ -218,18 +243,348 @@ def minimaxValue(board, alpha, beta):
             alpha = max(alpha, bestValue)
             # If in anytime beta <= alpha then we know the maximizing player would never choose this option. Abort branch
             if beta <= alpha:
+                recordCutoff(action, ply)
                 break
         return bestValue, bestAction
     else:
         bestValue = math.inf
         bestAction = None
-        for action in actions(board):
+        for action in searchActions(board, ply):
             newBoard = result(board, action)
-            value, _ = minimaxValue(newBoard, alpha, beta)
+            value, _ = minimaxValue(newBoard, alpha, beta, ply + 1)
             if value < bestValue:
                 bestValue = value
                 bestAction = action
             beta = min(beta, bestValue)
             if beta <= alpha:
+                recordCutoff(action, ply)
                 break
-        return bestValue, bestAction
\ No newline at end of file
+        return bestValue, bestAction
+
+
+""" 
+Returns the actions minimaxValue should search on a board, in the order to search them.
+Moves that lead to the same position as an earlier move, up to a symmetry of the board, are left out
+"""
+def searchActions(board, ply):
+    possibleActions = actions(board)
+    if not MOVE_ORDERING:
+        ordered = list(possibleActions)
+    else:
+        # Killer moves first, then the center, the corners and the edges. Row and column break ties
+        killerMoves = killers.get(ply, [])
+        size = len(board) - 1
+
+        def priority(action):
+            row, col = action
+            if action in killerMoves:
+                return (0, killerMoves.index(action), row, col)
+            elif 2 * row == size and 2 * col == size:
+                return (1, 0, row, col)
+            elif row in (0, size) and col in (0, size):
+                return (2, 0, row, col)
+            return (3, 0, row, col)
+
+        ordered = sorted(possibleActions, key=priority)
+
+    if not SYMMETRY_PRUNING:
+        return ordered
+
+    symmetries = boardSymmetries(board)
+    if not symmetries:
+        return ordered
+    searched = []
+    seen = set()
+    for action in ordered:
+        if action in seen:
+            continue
+        searched.append(action)
+        # Every image of this move under a symmetry of the board leads to an equivalent position
+        seen.update(symmetry(action) for symmetry in symmetries)
+    return searched
+
+
+""" 
+Returns the symmetries of a square board that leave it unchanged, other than the identity.
+Each symmetry is a function mapping a cell (row, col) to its image
+"""
+def boardSymmetries(board):
+    size = len(board)
+    if any(len(row) != size for row in board):
+        return []
+
+    last = size - 1
+    candidates = [
+        lambda cell: (cell[1], last - cell[0]),
+        lambda cell: (last - cell[0], last - cell[1]),
+        lambda cell: (last - cell[1], cell[0]),
+        lambda cell: (cell[0], last - cell[1]),
+        lambda cell: (last - cell[0], cell[1]),
+        lambda cell: (cell[1], cell[0]),
+        lambda cell: (last - cell[1], last - cell[0]),
+    ]
+    cells = [(row, col) for row in range(size) for col in range(size)]
+    return [symmetry for symmetry in candidates
+            if all(board[row][col] == board[image[0]][image[1]]
+                   for (row, col), image in ((cell, symmetry(cell)) for cell in cells))]
+
+
+""" 
+Counts a cutoff and remembers the move that caused it as a killer move for its ply
+"""
+def recordCutoff(action, ply):
+    stats["cutoffs"] += 1
+    if not MOVE_ORDERING:
+        return
+    killerMoves = killers.setdefault(ply, [])
+    if action in killerMoves:
+        killerMoves.remove(action)
+    killerMoves.insert(0, action)
+    # Two killer moves per ply are enough on boards this small
+    del killerMoves[2:]
+
+
+# Scores used by the depth limited search. A win is worth more than any heuristic evaluation,
+# and quicker wins are worth more than slower ones
+WIN_SCORE = 10 ** 15
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+""" 
+Iterative deepening alpha-beta search for boards of any size and win length.
+Searches one ply deeper at a time until timeLimit seconds pass, keeping the best action
+of the last complete iteration. Each iteration tries the previous best action first.
+With more than one worker every iteration splits its root moves across processes
+"""
+def deepeningSearch(board, timeLimit, workers=1):
+    deadline = time.perf_counter() + timeLimit
+    work = [row[:] for row in board]
+    currentPlayer = player(board)
+    moves = orderedActions(board)
+    bestAction = moves[0]
+
+    for depth in range(1, len(moves) + 1):
+        try:
+            if workers > 1:
+                value, action = parallelSearch(work, depth, workers, deadline, bestAction)
+            else:
+                value, action = depthLimitedValue(work, currentPlayer, depth, -math.inf, math.inf, deadline, bestAction)
+        except SearchTimeout:
+            break
+        bestAction = action
+        # A forced result will not change with a deeper search
+        if abs(value) >= WIN_SCORE - len(moves):
+            break
+    return bestAction
+
+
+""" 
+Alpha-beta search to a fixed depth over a board that is changed in place and restored.
+Returns (value, action) with X maximizing, using evaluate when the depth runs out.
+firstAction, when given, is searched before any other action
+"""
+def depthLimitedValue(board, currentPlayer, depth, alpha, beta, deadline, firstAction=None, ply=0):
+    if time.perf_counter() > deadline:
+        raise SearchTimeout()
+
+    moves = orderedActions(board)
+    if firstAction in moves:
+        moves.remove(firstAction)
+        moves.insert(0, firstAction)
+    if not moves:
+        return 0, None
+    if depth == 0:
+        return evaluate(board), None
+
+    maximizing = currentPlayer == X
+    bestValue = -math.inf if maximizing else math.inf
+    bestAction = None
+    for row, col in moves:
+        value = moveValue(board, currentPlayer, (row, col), depth, alpha, beta, deadline, ply)
+        if (maximizing and value > bestValue) or (not maximizing and value < bestValue):
+            bestValue = value
+            bestAction = (row, col)
+        if maximizing:
+            alpha = max(alpha, bestValue)
+        else:
+            beta = min(beta, bestValue)
+        if beta <= alpha:
+            break
+    return bestValue, bestAction
+
+
+""" 
+Value of currentPlayer making move on a board, searched depth plies deep counting the move itself
+"""
+def moveValue(board, currentPlayer, move, depth, alpha, beta, deadline, ply=0):
+    row, col = move
+    board[row][col] = currentPlayer
+    try:
+        if wonWith(board, row, col):
+            # Winning sooner scores higher than winning later
+            return WIN_SCORE - ply if currentPlayer == X else -(WIN_SCORE - ply)
+        opponent = O if currentPlayer == X else X
+        value, _ = depthLimitedValue(board, opponent, depth - 1, alpha, beta, deadline, ply=ply + 1)
+        return value
+    finally:
+        board[row][col] = EMPTY
+
+
+# Process pool of the parallel search and the bound its workers share, created on first use
+searchPool = None
+searchPoolWorkers = 0
+sharedBound = None
+
+
+""" 
+Depth limited search that splits the root moves across a pool of worker processes.
+Returns the same (value, action) as depthLimitedValue at the root.
+
+The first move is searched here on its own (young brothers wait) to get a bound,
+then the others run in the pool. Every worker starts from the best value found so far,
+and publishes its own value when it improves on it
+"""
+def parallelSearch(board, depth, workers, deadline=math.inf, firstAction=None):
+    currentPlayer = player(board)
+    maximizing = currentPlayer == X
+    moves = orderedActions(board)
+    if firstAction in moves:
+        moves.remove(firstAction)
+        moves.insert(0, firstAction)
+    if not moves:
+        return 0, None
+
+    pool, bound = workerPool(workers)
+    values = [moveValue(board, currentPlayer, moves[0], depth, -math.inf, math.inf, deadline)]
+    bound.value = values[0]
+
+    futures = [pool.submit(searchRootMove, board, currentPlayer, move, depth, deadline, WIN_LENGTH)
+               for move in moves[1:]]
+    done, pending = wait(futures, return_when=FIRST_EXCEPTION)
+    for future in pending:
+        future.cancel()
+    values.extend(future.result() for future in futures)
+
+    # Moves that could not beat the bound came back as bounds below it, so they never win here.
+    # Ties go to the earliest move, just as in the sequential search
+    best = max(values) if maximizing else min(values)
+    index = values.index(best)
+    return best, moves[index]
+
+
+""" 
+Returns the pool of parallelSearch, replacing it when the number of workers changes.
+The workers start here, so a program with threads should call this from its main thread first
+"""
+def workerPool(workers):
+    global searchPool, searchPoolWorkers, sharedBound
+    if searchPool is None or searchPoolWorkers != workers:
+        if searchPool is not None:
+            searchPool.shutdown(cancel_futures=True)
+        # Fork keeps the worker start up cheap, where it exists
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        sharedBound = context.Value("d", 0.0)
+        searchPool = ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                         initializer=initWorker, initargs=(sharedBound,))
+        # The workers only start with the first task, so hand it one now rather than
+        # fork from whichever thread happens to search first
+        searchPool.submit(int).result()
+        searchPoolWorkers = workers
+    return searchPool, sharedBound
+
+
+def initWorker(bound):
+    global sharedBound
+    sharedBound = bound
+
+
+""" 
+Searches one root move in a worker of parallelSearch.
+The window starts one below the shared bound: the evaluations are whole numbers, so every move
+at least as good as the bound gets its exact value, and any worse one a value below the bound
+"""
+def searchRootMove(board, currentPlayer, move, depth, deadline, winLength):
+    global WIN_LENGTH
+    WIN_LENGTH = winLength
+    maximizing = currentPlayer == X
+    if maximizing:
+        alpha, beta = sharedBound.value - 1, math.inf
+    else:
+        alpha, beta = -math.inf, sharedBound.value + 1
+
+    value = moveValue(board, currentPlayer, move, depth, alpha, beta, deadline)
+    with sharedBound.get_lock():
+        if (maximizing and value > sharedBound.value) or (not maximizing and value < sharedBound.value):
+            sharedBound.value = value
+    return value
+
+
+""" 
+Returns the empty cells of a board that is not yet won, the most promising first:
+cells next to marks already on the board, then the ones closest to the center
+"""
+def orderedActions(board):
+    rows = len(board)
+    cols = len(board[0])
+    centerRow = (rows - 1) / 2
+    centerCol = (cols - 1) / 2
+
+    def priority(cell):
+        row, col = cell
+        neighbors = 0
+        for i in range(max(row - 1, 0), min(row + 2, rows)):
+            for j in range(max(col - 1, 0), min(col + 2, cols)):
+                if board[i][j] is not EMPTY:
+                    neighbors += 1
+        return (-neighbors, abs(row - centerRow) + abs(col - centerCol), row, col)
+
+    empty = [(row, col) for row in range(rows) for col in range(cols) if board[row][col] is EMPTY]
+    return sorted(empty, key=priority)
+
+
+""" 
+Returns True if the mark at (row, col) completes WIN_LENGTH in a row through that cell
+"""
+def wonWith(board, row, col):
+    mark = board[row][col]
+    rows = len(board)
+    cols = len(board[0])
+    for dRow, dCol in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+        count = 1
+        # Count the same marks on both sides of the cell along this direction
+        for sign in (1, -1):
+            i = row + sign * dRow
+            j = col + sign * dCol
+            while 0 <= i < rows and 0 <= j < cols and board[i][j] == mark:
+                count += 1
+                i += sign * dRow
+                j += sign * dCol
+        if count >= WIN_LENGTH:
+            return True
+    return False
+
+
+""" 
+Heuristic value of a board where the search stopped, positive when X is better placed.
+Every stretch of WIN_LENGTH cells that only one player has marks in counts for that player,
+more the closer it is to being complete
+"""
+def evaluate(board):
+    score = 0
+    for line in winningLines(len(board), len(board[0]), WIN_LENGTH):
+        numberX = 0
+        numberO = 0
+        for row, col in line:
+            if board[row][col] == X:
+                numberX += 1
+            elif board[row][col] == O:
+                numberO += 1
+        if numberO == 0 and numberX > 0:
+            score += 10 ** (numberX - 1)
+        elif numberX == 0 and numberO > 0:
+            score -= 10 ** (numberO - 1)
+    return score
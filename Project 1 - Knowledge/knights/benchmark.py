@@ -0,0 +1,198 @@
+import itertools
+import random
+import time
+
+import puzzle
+from logic import *
+
+
+def main():
+    time_metadata()
+    compare_evaluation()
+    compare_methods(["enumerate", "compiled", "bitwise", "sat"])
+    compare_sessions()
+    compare_simplified()
+
+
+def time_metadata(characters=2000, repeats=20):
+    """
+    Prints the time to build a large random puzzle and to ask for its symbols,
+    hash and formula again and again, as entailment checks do.
+    """
+    start = time.perf_counter()
+    knowledge, symbols = island(characters)
+    built = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(repeats):
+        knowledge.symbols()
+        hash(knowledge)
+        knowledge.formula()
+    asked = time.perf_counter() - start
+    print(f"{len(knowledge.conjuncts)} sentences: built in {built * 1000:.1f}ms, "
+          f"symbols, hash and formula {asked / repeats * 1000:.2f}ms per call")
+
+
+def compare_evaluation():
+    """
+    Prints the cost per model of evaluating puzzle 3 by walking the sentence,
+    with the compiled function, and with the vectorized NumPy evaluation.
+    """
+    compiled = CompiledSentence(puzzle.knowledge3)
+    rows = list(itertools.product((True, False), repeat=len(compiled.symbols)))
+    models = [dict(zip(compiled.symbols, row)) for row in rows] * 200
+
+    start = time.perf_counter()
+    expected = [puzzle.knowledge3.evaluate(model) for model in models]
+    walked = time.perf_counter() - start
+
+    start = time.perf_counter()
+    results = [compiled.function(row) for row in rows * 200]
+    flattened = time.perf_counter() - start
+    if results != expected:
+        raise Exception("compiled evaluation disagrees")
+
+    line = (f"puzzle 3 per model: tree {walked / len(models) * 1e6:.2f}us, "
+            f"compiled {flattened / len(models) * 1e6:.2f}us")
+    if numpy is not None:
+        array = numpy.array(rows * 200, dtype=bool)
+        start = time.perf_counter()
+        vector = compiled.evaluate_many(array)
+        vectorized = time.perf_counter() - start
+        if vector.tolist() != expected:
+            raise Exception("vectorized evaluation disagrees")
+        line += f", vectorized {vectorized / len(models) * 1e6:.3f}us"
+    print(line)
+
+
+def island(characters, seed=50):
+    """
+    Returns (knowledge, symbols) for a random knights and knaves puzzle.
+    Every character is a knight or a knave but not both, and says something about
+    the others that is true exactly when they are a knight.
+    """
+    rng = random.Random(seed)
+    knights = [Symbol(f"{i} is a Knight") for i in range(characters)]
+    knaves = [Symbol(f"{i} is a Knave") for i in range(characters)]
+    knowledge = And()
+    for i in range(characters):
+        knowledge.add(Or(knights[i], knaves[i]))
+        knowledge.add(Not(And(knights[i], knaves[i])))
+
+        # The statement mentions up to three other characters
+        others = rng.sample(range(characters), min(3, characters))
+        claims = [knights[j] if rng.random() < 0.5 else knaves[j] for j in others]
+        statement = And(*claims) if rng.random() < 0.5 else Or(*claims)
+        knowledge.add(Biconditional(knights[i], statement))
+    return knowledge, knights + knaves
+
+
+def time_method(method, knowledge, symbols):
+    """
+    Returns the entailed symbols and the seconds it took to check all of them.
+    """
+    start = time.perf_counter()
+    entailed = [symbol for symbol in symbols if model_check(knowledge, symbol, method=method)]
+    return entailed, time.perf_counter() - start
+
+
+def compare_methods(methods, limits=None):
+    """
+    Prints the time every method takes to check each symbol of growing random puzzles,
+    checking they all entail the same symbols. A method stops once it gets slower than
+    its limit in seconds, the enumerating methods are limited to about a second by default
+    and the bitwise one to half a second, as one more size multiplies its time by 64.
+    """
+    limits = limits or {"enumerate": 1.0, "compiled": 1.0, "bitwise": 0.5}
+    active = list(methods)
+    for characters in [2, 3, 4, 5, 6, 7, 8, 10, 12, 15, 20, 30, 50]:
+        knowledge, symbols = island(characters)
+        line = f"{2 * characters:>3} symbols:"
+        results = {}
+        for method in list(active):
+            entailed, elapsed = time_method(method, knowledge, symbols)
+            results[method] = entailed
+            line += f"  {method} {elapsed * 1000:9.2f}ms"
+            if elapsed > limits.get(method, float("inf")):
+                active.remove(method)
+        if len({tuple(map(repr, entailed)) for entailed in results.values()}) > 1:
+            raise Exception(f"methods disagree on {characters} characters")
+        print(line)
+        if not active:
+            break
+
+
+def compare_sessions(limit=1.0):
+    """
+    Prints the time to classify every symbol of growing random puzzles with one
+    model_check per symbol and its negation, and with a session of each method.
+    A way stops once it gets slower than limit seconds.
+    """
+    ways = {
+        "model_check": lambda knowledge, symbols: {
+            symbol: True if model_check(knowledge, symbol, method="sat")
+            else False if model_check(knowledge, Not(symbol), method="sat") else None
+            for symbol in symbols},
+        "bitwise session": lambda knowledge, symbols: KnowledgeSession(knowledge).classify(symbols),
+        "sat session": lambda knowledge, symbols: KnowledgeSession(knowledge, "sat").classify(symbols),
+    }
+    active = list(ways)
+    for characters in [2, 4, 6, 8, 10, 12, 15, 20, 30, 50]:
+        knowledge, symbols = island(characters)
+        line = f"{2 * characters:>3} symbols:"
+        results = {}
+        for way in list(active):
+            start = time.perf_counter()
+            results[way] = ways[way](knowledge, symbols)
+            elapsed = time.perf_counter() - start
+            line += f"  {way} {elapsed * 1000:8.2f}ms"
+            if elapsed > limit:
+                active.remove(way)
+        if len({tuple(result.items()) for result in results.values()}) > 1:
+            raise Exception(f"sessions disagree on {characters} characters")
+        print(line)
+        if not active:
+            break
+
+
+def size(sentence):
+    """Returns the number of nodes in a sentence."""
+    if isinstance(sentence, Symbol):
+        return 1
+    elif isinstance(sentence, Not):
+        return 1 + size(sentence.operand)
+    elif isinstance(sentence, And):
+        return 1 + sum(size(conjunct) for conjunct in sentence.conjuncts)
+    elif isinstance(sentence, Or):
+        return 1 + sum(size(disjunct) for disjunct in sentence.disjuncts)
+    elif isinstance(sentence, Implication):
+        return 1 + size(sentence.antecedent) + size(sentence.consequent)
+    return 1 + size(sentence.left) + size(sentence.right)
+
+
+def compare_simplified(methods=("enumerate", "compiled")):
+    """
+    Prints the size of the puzzles and of random puzzles before and after simplify,
+    and the time model_check takes to check every symbol against each,
+    checking they entail the same symbols.
+    """
+    symbols = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight, puzzle.BKnave, puzzle.CKnight, puzzle.CKnave]
+    cases = [(f"puzzle {i}", knowledge, symbols) for i, knowledge in enumerate(
+        [puzzle.knowledge0, puzzle.knowledge1, puzzle.knowledge2, puzzle.knowledge3])]
+    cases += [(f"island {characters}", *island(characters)) for characters in (4, 6)]
+    for name, knowledge, symbols in cases:
+        start = time.perf_counter()
+        simplified = simplify(knowledge)
+        elapsed = time.perf_counter() - start
+        line = f"{name:>9}: {size(knowledge):3} -> {size(simplified):3} nodes in {elapsed * 1000:.2f}ms"
+        for method in methods:
+            entailed, before = time_method(method, knowledge, symbols)
+            simplifiedEntailed, after = time_method(method, simplified, symbols)
+            if entailed != simplifiedEntailed:
+                raise Exception(f"simplified {name} entails other symbols")
+            line += f"  {method} {before * 1000:7.2f}ms -> {after * 1000:7.2f}ms"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
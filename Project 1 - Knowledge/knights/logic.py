@@ -1,7 +1,24 @@
+import heapq
 import itertools
+import weakref
+from functools import lru_cache
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+# Symbols, negations, implications and biconditionals currently alive, keyed on their class
+# and parts, so building an identical one returns the existing sentence
+interned = weakref.WeakValueDictionary()
+
+# Bumped by And.add, so cached values of sentences containing a conjunction are recomputed
+edits = 0
 
 
 class Sentence():
+    __slots__ = ("cachedHash", "cachedSymbols", "cachedFormula", "cachedAt", "__weakref__")
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -12,14 +29,53 @@ class Sentence():
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        return frozenset()
+
+    def expression(self, index, vector=False):
+        """
+        Returns Python source evaluating the sentence, where symbol i of
+        index is v[i]. With vector, symbols are bit arrays c[i] combined with
+        bitwise operators, either NumPy arrays or Python integers.
+        """
+        raise Exception("nothing to compile")
 
     @classmethod
     def validate(cls, sentence):
         if not isinstance(sentence, Sentence):
             raise TypeError("must be a logical sentence")
 
+    @classmethod
+    def intern(cls, *parts):
+        """
+        Returns the live sentence of this class with these parts, creating it if there is none.
+        Parts that are sentences are told apart by identity, as equal immutable ones are shared.
+        """
+        key = (cls, *[id(part) if isinstance(part, Sentence) else part for part in parts])
+        try:
+            return interned[key]
+        except KeyError:
+            pass
+        sentence = object.__new__(cls)
+        sentence.reset()
+
+        # Only a sentence without conjunctions or disjunctions inside can never change
+        changing = any(isinstance(part, Sentence) and part.cachedAt is not None for part in parts)
+        sentence.cachedAt = edits if changing else None
+        interned[key] = sentence
+        return sentence
+
+    def reset(self):
+        self.cachedHash = None
+        self.cachedSymbols = None
+        self.cachedFormula = None
+
+    def refresh(self):
+        """Clears the cached values if a conjunction may have changed since they were computed."""
+        if self.cachedAt is not None and self.cachedAt != edits:
+            self.reset()
+            self.cachedAt = edits
+
     @classmethod
     def parenthesize(cls, s):
         """Parenthesizes an expression if not already parenthesized."""
@@ -43,15 +99,24 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
+
+    def __new__(cls, name):
+        return cls.intern(name)
 
     def __init__(self, name):
         self.name = name
 
+    def __reduce__(self):
+        return (Symbol, (self.name,))
+
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+        return self is other or isinstance(other, Symbol) and self.name == other.name
 
     def __hash__(self):
-        return hash(("symbol", self.name))
+        if self.cachedHash is None:
+            self.cachedHash = hash(("symbol", self.name))
+        return self.cachedHash
 
     def __repr__(self):
         return self.name
@@ -66,19 +131,35 @@ class Symbol(Sentence):
         return self.name
 
     def symbols(self):
-        return {self.name}
+        if self.cachedSymbols is None:
+            self.cachedSymbols = frozenset((self.name,))
+        return self.cachedSymbols
+
+    def expression(self, index, vector=False):
+        return f"c[{index[self.name]}]" if vector else f"v[{index[self.name]}]"
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
         Sentence.validate(operand)
+        return cls.intern(operand)
+
+    def __init__(self, operand):
         self.operand = operand
 
+    def __reduce__(self):
+        return (Not, (self.operand,))
+
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or isinstance(other, Not) and self.operand == other.operand
 
     def __hash__(self):
-        return hash(("not", hash(self.operand)))
+        self.refresh()
+        if self.cachedHash is None:
+            self.cachedHash = hash(("not", hash(self.operand)))
+        return self.cachedHash
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -87,25 +168,42 @@ class Not(Sentence):
         return not self.operand.evaluate(model)
 
     def formula(self):
-        return "¬" + Sentence.parenthesize(self.operand.formula())
+        self.refresh()
+        if self.cachedFormula is None:
+            self.cachedFormula = "¬" + Sentence.parenthesize(self.operand.formula())
+        return self.cachedFormula
 
     def symbols(self):
         return self.operand.symbols()
 
+    def expression(self, index, vector=False):
+        operand = self.operand.expression(index, vector)
+        return f"(~{operand})" if vector else f"(not {operand})"
+
 
 class And(Sentence):
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
+        self.reset()
+        self.cachedAt = edits
+
+    def __reduce__(self):
+        return (And, tuple(self.conjuncts))
 
     def __eq__(self, other):
         return isinstance(other, And) and self.conjuncts == other.conjuncts
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        self.refresh()
+        if self.cachedHash is None:
+            self.cachedHash = hash(
+                ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+            )
+        return self.cachedHash
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,35 +212,63 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
+        global edits
         Sentence.validate(conjunct)
         self.conjuncts.append(conjunct)
 
+        # Every sentence containing this one may now be out of date
+        edits += 1
+
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
     def formula(self):
-        if len(self.conjuncts) == 1:
-            return self.conjuncts[0].formula()
-        return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
-                           for conjunct in self.conjuncts])
+        self.refresh()
+        if self.cachedFormula is None:
+            if len(self.conjuncts) == 1:
+                self.cachedFormula = self.conjuncts[0].formula()
+            else:
+                self.cachedFormula = " ∧ ".join([Sentence.parenthesize(conjunct.formula())
+                                                 for conjunct in self.conjuncts])
+        return self.cachedFormula
 
     def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        self.refresh()
+        if self.cachedSymbols is None:
+            self.cachedSymbols = frozenset().union(*[conjunct.symbols() for conjunct in self.conjuncts])
+        return self.cachedSymbols
+
+    def expression(self, index, vector=False):
+        if not self.conjuncts:
+            return "ones" if vector else "True"
+        joiner = " & " if vector else " and "
+        return "(" + joiner.join(conjunct.expression(index, vector)
+                                 for conjunct in self.conjuncts) + ")"
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
+        self.reset()
+        self.cachedAt = edits
+
+    def __reduce__(self):
+        return (Or, tuple(self.disjuncts))
 
     def __eq__(self, other):
         return isinstance(other, Or) and self.disjuncts == other.disjuncts
 
     def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+        self.refresh()
+        if self.cachedHash is None:
+            self.cachedHash = hash(
+                ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+            )
+        return self.cachedHash
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -152,29 +278,54 @@ class Or(Sentence):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
     def formula(self):
-        if len(self.disjuncts) == 1:
-            return self.disjuncts[0].formula()
-        return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
-                            for disjunct in self.disjuncts])
+        self.refresh()
+        if self.cachedFormula is None:
+            if len(self.disjuncts) == 1:
+                self.cachedFormula = self.disjuncts[0].formula()
+            else:
+                self.cachedFormula = " ∨  ".join([Sentence.parenthesize(disjunct.formula())
+                                                  for disjunct in self.disjuncts])
+        return self.cachedFormula
 
     def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        self.refresh()
+        if self.cachedSymbols is None:
+            self.cachedSymbols = frozenset().union(*[disjunct.symbols() for disjunct in self.disjuncts])
+        return self.cachedSymbols
+
+    def expression(self, index, vector=False):
+        if not self.disjuncts:
+            return "zeros" if vector else "False"
+        joiner = " | " if vector else " or "
+        return "(" + joiner.join(disjunct.expression(index, vector)
+                                 for disjunct in self.disjuncts) + ")"
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
+        return cls.intern(antecedent, consequent)
+
+    def __init__(self, antecedent, consequent):
         self.antecedent = antecedent
         self.consequent = consequent
 
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
+
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (isinstance(other, Implication)
+                                 and self.antecedent == other.antecedent
+                                 and self.consequent == other.consequent)
 
     def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        self.refresh()
+        if self.cachedHash is None:
+            self.cachedHash = hash(("implies", hash(self.antecedent), hash(self.consequent)))
+        return self.cachedHash
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -184,28 +335,52 @@ class Implication(Sentence):
                 or self.consequent.evaluate(model))
 
     def formula(self):
-        antecedent = Sentence.parenthesize(self.antecedent.formula())
-        consequent = Sentence.parenthesize(self.consequent.formula())
-        return f"{antecedent} => {consequent}"
+        self.refresh()
+        if self.cachedFormula is None:
+            antecedent = Sentence.parenthesize(self.antecedent.formula())
+            consequent = Sentence.parenthesize(self.consequent.formula())
+            self.cachedFormula = f"{antecedent} => {consequent}"
+        return self.cachedFormula
 
     def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+        self.refresh()
+        if self.cachedSymbols is None:
+            self.cachedSymbols = self.antecedent.symbols() | self.consequent.symbols()
+        return self.cachedSymbols
+
+    def expression(self, index, vector=False):
+        antecedent = self.antecedent.expression(index, vector)
+        consequent = self.consequent.expression(index, vector)
+        if vector:
+            return f"(~{antecedent} | {consequent})"
+        return f"((not {antecedent}) or {consequent})"
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
+        return cls.intern(left, right)
+
+    def __init__(self, left, right):
         self.left = left
         self.right = right
 
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
+
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (isinstance(other, Biconditional)
+                                 and self.left == other.left
+                                 and self.right == other.right)
 
     def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+        self.refresh()
+        if self.cachedHash is None:
+            self.cachedHash = hash(("biconditional", hash(self.left), hash(self.right)))
+        return self.cachedHash
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -217,16 +392,317 @@ class Biconditional(Sentence):
                     and not self.right.evaluate(model)))
 
     def formula(self):
-        left = Sentence.parenthesize(str(self.left))
-        right = Sentence.parenthesize(str(self.right))
-        return f"{left} <=> {right}"
+        self.refresh()
+        if self.cachedFormula is None:
+            left = Sentence.parenthesize(str(self.left))
+            right = Sentence.parenthesize(str(self.right))
+            self.cachedFormula = f"{left} <=> {right}"
+        return self.cachedFormula
 
     def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
+        self.refresh()
+        if self.cachedSymbols is None:
+            self.cachedSymbols = self.left.symbols() | self.right.symbols()
+        return self.cachedSymbols
+
+    def expression(self, index, vector=False):
+        left = self.left.expression(index, vector)
+        right = self.right.expression(index, vector)
+        # Each side is evaluated once, unlike Biconditional.evaluate
+        return f"(~({left} ^ {right}))" if vector else f"({left} == {right})"
+
+
+def simplify(sentence):
+    """
+    Returns a smaller sentence equivalent to sentence. Nested conjunctions and disjunctions
+    are flattened, repeated parts and double negations dropped, constants folded and
+    absorbed parts removed, and symbols fixed by a literal next to them replaced by constants.
+    An empty And() stands for true and an empty Or() for false.
+    """
+    Sentence.validate(sentence)
+    if isinstance(sentence, Symbol):
+        return sentence
+
+    elif isinstance(sentence, Not):
+        operand = simplify(sentence.operand)
+        value = constant(operand)
+        if value is not None:
+            return Or() if value else And()
+        return negation(operand)
+
+    elif isinstance(sentence, (And, Or)):
+        conjunction = isinstance(sentence, And)
+        parts = sentence.conjuncts if conjunction else sentence.disjuncts
+
+        # Flatten parts of the same kind and fold constants: true is dropped from a conjunction,
+        # false decides it, and the other way around for a disjunction
+        flat = []
+        for part in parts:
+            part = simplify(part)
+            value = constant(part)
+            if value is None:
+                if isinstance(part, type(sentence)):
+                    flat.extend(part.conjuncts if conjunction else part.disjuncts)
+                else:
+                    flat.append(part)
+            elif value != conjunction:
+                return part
+
+        # Drop repeated parts, and look for a part next to its own negation
+        unique = list(dict.fromkeys(flat))
+        present = set(unique)
+        if any(negation(part) in present for part in unique):
+            return Or() if conjunction else And()
+
+        # Absorption: A ∧ (A ∨ B) is A, and A ∨ (A ∧ B) is A
+        other = Or if conjunction else And
+        kept = []
+        for part in unique:
+            inner = (part.disjuncts if conjunction else part.conjuncts) if isinstance(part, other) else ()
+            if not any(member in present for member in inner):
+                kept.append(part)
+
+        # A literal fixes its symbol in the other parts: A ∧ F is A ∧ F[A := true]
+        # and A ∨ F is A ∨ F[A := false]. Each round removes symbols, so this ends
+        values = {}
+        for part in kept:
+            if literal(part) is not None:
+                name, value = literal(part)
+                values[name] = value if conjunction else not value
+        rest = [part for part in kept if literal(part) is None]
+        if values and any(values.keys() & part.symbols() for part in rest):
+            literals = [part for part in kept if literal(part) is not None]
+            return simplify(type(sentence)(*literals, *[substitute(part, values) for part in rest]))
+
+        if len(kept) == 1:
+            return kept[0]
+        return And(*kept) if conjunction else Or(*kept)
+
+    elif isinstance(sentence, Implication):
+        antecedent = simplify(sentence.antecedent)
+        consequent = simplify(sentence.consequent)
+        if constant(antecedent) is True:
+            return consequent
+        if constant(antecedent) is False or constant(consequent) is True or antecedent == consequent:
+            return And()
+        if constant(consequent) is False:
+            return negation(antecedent)
+
+        # A ⇒ ¬A is ¬A, and ¬B ⇒ B is B
+        if consequent == negation(antecedent):
+            return consequent
+
+        # The consequent only matters where the antecedent holds, and the other way around
+        if literal(antecedent) is not None and antecedent.symbols() & consequent.symbols():
+            name, value = literal(antecedent)
+            return simplify(Implication(antecedent, substitute(consequent, {name: value})))
+        if literal(consequent) is not None and consequent.symbols() & antecedent.symbols():
+            name, value = literal(consequent)
+            return simplify(Implication(substitute(antecedent, {name: not value}), consequent))
+        return Implication(antecedent, consequent)
+
+    elif isinstance(sentence, Biconditional):
+        left = simplify(sentence.left)
+        right = simplify(sentence.right)
+        for one, other in ((left, right), (right, left)):
+            if constant(one) is True:
+                return other
+            if constant(one) is False:
+                return simplify(Not(other))
+        if left == right:
+            return And()
+        if left == negation(right):
+            return Or()
+        return Biconditional(left, right)
+
+    raise TypeError(f"cannot simplify {sentence}")
+
+
+def constant(sentence):
+    """Returns True for an empty And(), False for an empty Or() and None for anything else."""
+    if isinstance(sentence, And) and not sentence.conjuncts:
+        return True
+    if isinstance(sentence, Or) and not sentence.disjuncts:
+        return False
+    return None
+
+
+def literal(sentence):
+    """Returns (name, value) if the sentence is a symbol or a negated symbol, None otherwise."""
+    if isinstance(sentence, Symbol):
+        return sentence.name, True
+    if isinstance(sentence, Not) and isinstance(sentence.operand, Symbol):
+        return sentence.operand.name, False
+    return None
+
+
+def substitute(sentence, values):
+    """
+    Returns the sentence with the symbols named in values replaced by
+    the constant And() for true or Or() for false.
+    """
+    if not values.keys() & sentence.symbols():
+        return sentence
+    elif isinstance(sentence, Symbol):
+        return And() if values[sentence.name] else Or()
+    elif isinstance(sentence, Not):
+        return Not(substitute(sentence.operand, values))
+    elif isinstance(sentence, And):
+        return And(*[substitute(conjunct, values) for conjunct in sentence.conjuncts])
+    elif isinstance(sentence, Or):
+        return Or(*[substitute(disjunct, values) for disjunct in sentence.disjuncts])
+    elif isinstance(sentence, Implication):
+        return Implication(substitute(sentence.antecedent, values),
+                           substitute(sentence.consequent, values))
+    elif isinstance(sentence, Biconditional):
+        return Biconditional(substitute(sentence.left, values),
+                             substitute(sentence.right, values))
+    raise TypeError(f"cannot substitute in {sentence}")
+
+
+def negation(sentence):
+    """Returns the negation of a sentence, removing a double negation."""
+    return sentence.operand if isinstance(sentence, Not) else Not(sentence)
+
+
+class CompiledSentence():
+    """
+    A sentence compiled to a single Python function over a list of truth values,
+    one per symbol in the order of self.symbols, instead of a walk of the sentence tree.
+    """
+
+    def __init__(self, sentence, symbols=None):
+        Sentence.validate(sentence)
+        self.sentence = sentence
+        self.symbols = sorted(sentence.symbols()) if symbols is None else list(symbols)
+        self.index = {name: i for i, name in enumerate(self.symbols)}
+        try:
+            self.function = eval(f"lambda v: {sentence.expression(self.index)}")
+        except (RecursionError, SyntaxError, MemoryError):
+            # Too deeply nested for the Python compiler, walk the tree instead
+            self.function = lambda v: sentence.evaluate(dict(zip(self.symbols, v)))
+        self.vector_function = None
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    def evaluate(self, model):
+        """Evaluates the sentence in a model mapping symbol names to truth values."""
+        try:
+            return self.function([bool(model[name]) for name in self.symbols])
+        except KeyError as e:
+            raise Exception(f"variable {e.args[0]} not in model")
+
+    def evaluate_many(self, models):
+        """
+        Evaluates the sentence in many models at once. models is a boolean
+        array with a row per model and a column per symbol, in the order of self.symbols.
+        Returns a boolean NumPy array with the truth value in each model.
+        """
+        if numpy is None:
+            raise ImportError("evaluate_many requires numpy")
+        if self.vector_function is None:
+            self.vector_function = eval(f"lambda c, ones, zeros: {self.sentence.expression(self.index, vector=True)}")
+
+        # Pack each column 8 models to a byte, so each operator handles 8 models at a time
+        models = numpy.asarray(models, dtype=bool)
+        size = (len(models) + 7) // 8
+        if self.symbols:
+            columns = numpy.packbits(models.reshape(len(models), len(self.symbols)), axis=0).T
+        else:
+            columns = numpy.zeros((0, size), dtype=numpy.uint8)
+        ones = numpy.full(size, 0xFF, dtype=numpy.uint8)
+        zeros = numpy.zeros(size, dtype=numpy.uint8)
+        packed = self.vector_function(columns, ones, zeros)
+        return numpy.unpackbits(packed, count=len(models)).astype(bool)
+
+
+# Rows of the truth table handled by one integer in the bitwise check, as a power of two
+CHUNK_BITS = 16
+
+
+@lru_cache(maxsize=None)
+def row_pattern(symbol, width):
+    """
+    Returns the column of a symbol among the first `width` symbols over the 2^width rows
+    of a truth table chunk, as an integer: bit r is set when bit `symbol` of r is.
+    """
+    run = 1 << symbol
+    block = ((1 << run) - 1) << run
+    # Repeat the block of `run` zeros followed by `run` ones across the whole chunk
+    repeat = ((1 << (1 << width)) - 1) // ((1 << (2 * run)) - 1)
+    return block * repeat
+
+
+def truth_table_chunks(count, chunk_bits=CHUNK_BITS):
+    """
+    Yields (columns, mask) for each chunk of the truth table of count symbols.
+    columns[i] is the integer bit column of symbol i over the rows of the chunk,
+    and mask has a bit set for every row. Only one chunk is in memory at a time.
+    """
+    for chunk in range(chunk_count(count, chunk_bits)):
+        yield chunk_columns(count, chunk, chunk_bits)
+
+
+def chunk_count(count, chunk_bits=CHUNK_BITS):
+    return 1 << max(count - chunk_bits, 0)
+
+
+def chunk_columns(count, chunk, chunk_bits=CHUNK_BITS):
+    """Returns (columns, mask) for one chunk of the truth table of count symbols."""
+    width = min(count, chunk_bits)
+    mask = (1 << (1 << width)) - 1
+    columns = [row_pattern(symbol, width) for symbol in range(width)]
+
+    # The remaining symbols are constant within a chunk
+    columns.extend(mask if chunk >> (symbol - width) & 1 else 0 for symbol in range(width, count))
+    return columns, mask
+
+
+def bitwise_function(sentence, index):
+    """Compiles a sentence to a function of integer bit columns, see Sentence.expression."""
+    return eval(f"lambda c, ones, zeros: {sentence.expression(index, vector=True)}")
+
+
+def bitwise_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, evaluating whole chunks of the truth table
+    at once with bitwise operations on integers, one bit per model.
+    """
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    index = {name: i for i, name in enumerate(symbols)}
+    knowledge = bitwise_function(knowledge, index)
+    query = bitwise_function(query, index)
+    for columns, mask in truth_table_chunks(len(symbols)):
+        # Any row where the knowledge holds and the query does not is a counterexample
+        if knowledge(columns, mask, 0) & ~query(columns, mask, 0) & mask:
+            return False
+    return True
+
+
+def compiled_check(knowledge, query):
+    """Checks if knowledge base entails query, enumerating models with compiled sentences."""
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    knowledge = CompiledSentence(knowledge, symbols).function
+    query = CompiledSentence(query, symbols).function
+    for values in itertools.product((True, False), repeat=len(symbols)):
+        if knowledge(values) and not query(values):
+            return False
+    return True
+
+
+def model_check(knowledge, query, method="enumerate"):
+    """
+    Checks if knowledge base entails query.
+    method "enumerate" checks every model, "compiled" does the same with
+    compiled sentences, "bitwise" evaluates chunks of the truth table as integer bit
+    columns, and "sat" asks the SAT solver whether knowledge ∧ ¬query has a model.
+    """
+    if method == "sat":
+        return sat_check(knowledge, query)
+    elif method == "bitwise":
+        return bitwise_check(knowledge, query)
+    elif method == "compiled":
+        return compiled_check(knowledge, query)
+    elif method != "enumerate":
+        raise ValueError(f"unknown method {method}")
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
@@ -257,7 +733,457 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set(knowledge.symbols() | query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+class CNF():
+    """
+    Conjunctive normal form of sentences by Tseitin encoding.
+
+    Symbols become variables 1, 2, ... and every compound subsentence gets a fresh
+    variable defined by clauses equivalent to it, so the size of the CNF
+    stays linear in the size of the sentences. Clauses are lists of
+    nonzero integers, negative for a negated variable.
+    """
+
+    def __init__(self):
+        self.variables = {}
+        self.clauses = []
+        self.count = 0
+        self.definitions = {}
+
+    def variable(self, name):
+        """Returns the variable of a symbol name, creating it if new."""
+        if name not in self.variables:
+            self.count += 1
+            self.variables[name] = self.count
+        return self.variables[name]
+
+    def fresh(self):
+        self.count += 1
+        return self.count
+
+    def add(self, sentence):
+        """Adds clauses asserting that the sentence is true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append([self.literal(disjunct) for disjunct in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            self.clauses.append([-self.literal(sentence.antecedent),
+                                 self.literal(sentence.consequent)])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to the sentence, adding its definition if needed."""
+        if isinstance(sentence, Symbol):
+            return self.variable(sentence.name)
+        elif isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+
+        # Identical subsentences share one definition
+        if sentence in self.definitions:
+            return self.definitions[sentence]
+
+        if isinstance(sentence, And):
+            parts = [self.literal(conjunct) for conjunct in sentence.conjuncts]
+            v = self.fresh()
+            for part in parts:
+                self.clauses.append([-v, part])
+            self.clauses.append([v] + [-part for part in parts])
+        elif isinstance(sentence, Or):
+            parts = [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            v = self.fresh()
+            for part in parts:
+                self.clauses.append([v, -part])
+            self.clauses.append([-v] + parts)
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            v = self.fresh()
+            self.clauses.extend([[-v, -a, b], [v, a], [v, -b]])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            v = self.fresh()
+            self.clauses.extend([[-v, -a, b], [-v, a, -b], [v, a, b], [v, -a, -b]])
+        else:
+            raise TypeError(f"cannot encode {sentence}")
+
+        self.definitions[sentence] = v
+        return v
+
+
+class Solver():
+    """
+    CDCL SAT solver: unit propagation over two watched literals per clause,
+    first UIP clause learning with non-chronological backjumping,
+    and activity based (VSIDS) decisions with phase saving.
+    """
+
+    def __init__(self, count, clauses):
+        self.count = count
+        self.assignment = [None] * (count + 1)
+        self.level = [0] * (count + 1)
+        self.reason = [None] * (count + 1)
+        self.phase = [False] * (count + 1)
+        self.activity = [0.0] * (count + 1)
+        self.increment = 1.0
+        self.order = [(0.0, v) for v in range(1, count + 1)]
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.watches = {}
+        self.conflicts = 0
+        self.unsatisfiable = False
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def value(self, literal):
+        """Returns True, False or None for a literal under the current assignment."""
+        value = self.assignment[abs(literal)]
+        if value is None:
+            return None
+        return value if literal > 0 else not value
+
+    def reserve(self, count):
+        """Makes room for variables up to count, added after the solver was created."""
+        for variable in range(self.count + 1, count + 1):
+            self.assignment.append(None)
+            self.level.append(0)
+            self.reason.append(None)
+            self.phase.append(False)
+            self.activity.append(0.0)
+            heapq.heappush(self.order, (0.0, variable))
+        self.count = max(self.count, count)
+
+    def add_clause(self, clause):
+        """Adds a clause, simplified against the level 0 assignment."""
+        self.backtrack(0)
+        literals = []
+        for literal in clause:
+            if -literal in literals:
+                return
+            if literal not in literals:
+                literals.append(literal)
+        literals = [literal for literal in literals if self.value(literal) is not False]
+        if any(self.value(literal) for literal in literals):
+            return
+        if not literals:
+            self.unsatisfiable = True
+        elif len(literals) == 1:
+            self.assign(literals[0], None)
+            if self.propagate() is not None:
+                self.unsatisfiable = True
+        else:
+            self.watch(literals)
+
+    def watch(self, clause):
+        self.watches.setdefault(clause[0], []).append(clause)
+        self.watches.setdefault(clause[1], []).append(clause)
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.assignment[variable] = literal > 0
+        self.level[variable] = len(self.limits)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """Propagates every assignment on the trail, returning a conflicting clause or None."""
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watchers = self.watches.get(false, [])
+            kept = []
+            conflict = None
+            i = 0
+            while i < len(watchers):
+                clause = watchers[i]
+                i += 1
+                # Keep the false literal in position 1
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.value(clause[0]) is True:
+                    kept.append(clause)
+                    continue
+
+                # Look for another literal that is not false to watch instead
+                for k in range(2, len(clause)):
+                    if self.value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches.setdefault(clause[1], []).append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.value(clause[0]) is False:
+                        conflict = clause
+                        kept.extend(watchers[i:])
+                        break
+                    self.assign(clause[0], clause)
+            self.watches[false] = kept
+            if conflict is not None:
+                self.head = len(self.trail)
+                return conflict
+        return None
+
+    def analyze(self, conflict):
+        """Returns the first UIP learnt clause of a conflict and the level to jump back to."""
+        current = len(self.limits)
+        seen = set()
+        learnt = [None]
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for q in clause:
+                variable = abs(q)
+                if q == literal or variable in seen or self.level[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.bump(variable)
+                if self.level[variable] == current:
+                    pending += 1
+                else:
+                    learnt.append(q)
+
+            # Walk back the trail to the next literal involved in the conflict
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reason[abs(literal)]
+        learnt[0] = -literal
+
+        if len(learnt) == 1:
+            return learnt, 0
+        # Watch the literal of the highest remaining level second, it is the one to become unit
+        deepest = max(range(1, len(learnt)), key=lambda i: self.level[abs(learnt[i])])
+        learnt[1], learnt[deepest] = learnt[deepest], learnt[1]
+        return learnt, self.level[abs(learnt[1])]
+
+    def bump(self, variable):
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            # Rescale every activity before they overflow
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.order = [(-self.activity[v], v) for v in range(1, self.count + 1)]
+            heapq.heapify(self.order)
+        heapq.heappush(self.order, (-self.activity[variable], variable))
+
+    def backtrack(self, level):
+        """Undoes every assignment made above the given decision level."""
+        if len(self.limits) <= level:
+            return
+        for literal in self.trail[self.limits[level]:]:
+            variable = abs(literal)
+            self.phase[variable] = self.assignment[variable]
+            self.assignment[variable] = None
+            self.reason[variable] = None
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Returns the unassigned variable with the highest activity, or None if all are assigned."""
+        while self.order:
+            _, variable = heapq.heappop(self.order)
+            if self.assignment[variable] is None:
+                return variable
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns a satisfying model as a dict of variable to bool, or None if there is none.
+        Assumptions are literals taken as true for this call only, clauses learnt under them
+        stay valid, so the solver can be asked again with other assumptions.
+        """
+        if self.unsatisfiable:
+            return None
+        self.backtrack(0)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.limits:
+                    self.unsatisfiable = True
+                    return None
+                learnt, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.watch(learnt)
+                    self.assign(learnt[0], learnt)
+                self.increment /= 0.95
+            else:
+                # Assumptions are decided first, one decision level each
+                decision = None
+                while decision is None and len(self.limits) < len(assumptions):
+                    literal = assumptions[len(self.limits)]
+                    if self.value(literal) is False:
+                        return None
+                    self.limits.append(len(self.trail))
+                    if self.value(literal) is None:
+                        decision = literal
+                if decision is None:
+                    variable = self.decide()
+                    if variable is None:
+                        return {v: self.assignment[v] for v in range(1, self.count + 1)}
+                    self.limits.append(len(self.trail))
+                    decision = variable if self.phase[variable] else -variable
+                self.assign(decision, None)
+
+
+def sat_check(knowledge, query):
+    """Checks if knowledge base entails query by refuting knowledge ∧ ¬query with the SAT solver."""
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    return Solver(cnf.count, cnf.clauses).solve() is None
+
+
+class KnowledgeSession():
+    """
+    A knowledge base prepared once to answer many entailment queries.
+
+    With method "bitwise" the session keeps the rows of the truth table where the knowledge
+    holds, as integer bitsets per chunk, so a query only evaluates the query itself.
+    With method "sat" it keeps one solver for the knowledge and asks it under assumptions,
+    keeping the clauses it learnt from one query to the next.
+    """
+
+    def __init__(self, knowledge, method="bitwise"):
+        if method not in ("bitwise", "sat"):
+            raise ValueError(f"unknown method {method}")
+        Sentence.validate(knowledge)
+        self.method = method
+        self.knowledge = And(knowledge)
+        if method == "sat":
+            self.cnf = CNF()
+            self.cnf.add(knowledge)
+            self.solver = Solver(self.cnf.count, self.cnf.clauses)
+            self.added = len(self.cnf.clauses)
+        else:
+            self.prepare()
+
+    def prepare(self):
+        """Computes the chunks of the truth table where the knowledge holds, keeping the non empty ones."""
+        self.symbols = sorted(self.knowledge.symbols())
+        self.index = {name: i for i, name in enumerate(self.symbols)}
+        knowledge = bitwise_function(self.knowledge, self.index)
+        self.rows = []
+        for chunk in range(chunk_count(len(self.symbols))):
+            columns, mask = chunk_columns(len(self.symbols), chunk)
+            rows = knowledge(columns, mask, 0) & mask
+            if rows:
+                self.rows.append((chunk, rows))
+
+    def encode(self):
+        """Passes the clauses added to the CNF since the last call on to the solver."""
+        self.solver.reserve(self.cnf.count)
+        for clause in self.cnf.clauses[self.added:]:
+            self.solver.add_clause(clause)
+        self.added = len(self.cnf.clauses)
+
+    def add(self, sentence):
+        """Adds a sentence to the knowledge base."""
+        Sentence.validate(sentence)
+        self.knowledge.add(sentence)
+        if self.method == "sat":
+            self.cnf.add(sentence)
+            self.encode()
+        elif sentence.symbols() <= set(self.symbols):
+            # Only rows where the new sentence holds as well remain
+            function = bitwise_function(sentence, self.index)
+            self.rows = [(chunk, rows & function(*chunk_columns(len(self.symbols), chunk), 0))
+                         for chunk, rows in self.rows]
+            self.rows = [(chunk, rows) for chunk, rows in self.rows if rows]
+        else:
+            self.prepare()
+
+    def entails(self, query):
+        """Checks if the knowledge base entails query."""
+        Sentence.validate(query)
+        if self.method == "sat":
+            literal = self.cnf.literal(query)
+            self.encode()
+            return self.solver.solve([-literal]) is None
+
+        if not query.symbols() <= set(self.symbols):
+            return bitwise_check(self.knowledge, query)
+        function = bitwise_function(query, self.index)
+        for chunk, rows in self.rows:
+            columns, mask = chunk_columns(len(self.symbols), chunk)
+            if rows & ~function(columns, mask, 0):
+                return False
+        return True
+
+    def classify(self, symbols):
+        """
+        Returns a dictionary mapping every symbol to True if the knowledge base entails it,
+        False if it entails its negation and None if it entails neither.
+        An inconsistent knowledge base entails everything, its symbols all map to True.
+        """
+        possible = {symbol: set() for symbol in symbols}
+        if self.method == "sat":
+            self.witness(possible, [])
+            for symbol in symbols:
+                for value in (True, False):
+                    if value not in possible[symbol]:
+                        variable = self.cnf.variable(symbol.name)
+                        self.solver.reserve(self.cnf.count)
+                        self.witness(possible, [variable if value else -variable])
+        else:
+            # One pass over the satisfying rows, noting the values each symbol takes in them
+            for chunk, rows in self.rows:
+                columns, mask = chunk_columns(len(self.symbols), chunk)
+                for symbol in symbols:
+                    if symbol.name not in self.index:
+                        possible[symbol].update((True, False))
+                        continue
+                    column = columns[self.index[symbol.name]]
+                    if rows & column:
+                        possible[symbol].add(True)
+                    if rows & ~column:
+                        possible[symbol].add(False)
+
+        consistent = self.consistent()
+        results = {}
+        for symbol in symbols:
+            if not consistent or possible[symbol] == {True}:
+                results[symbol] = True
+            elif possible[symbol] == {False}:
+                results[symbol] = False
+            else:
+                results[symbol] = None
+        return results
+
+    def witness(self, possible, assumptions):
+        """Solves under assumptions, noting the values of the symbols in the model found."""
+        model = self.solver.solve(assumptions)
+        if model is None:
+            return
+        for symbol, values in possible.items():
+            variable = self.cnf.variables.get(symbol.name)
+            if variable is None:
+                values.update((True, False))
+            else:
+                values.add(model[variable])
+
+    def consistent(self):
+        """Checks if the knowledge base has a model at all."""
+        if self.method == "sat":
+            return self.solver.solve() is not None
+        return bool(self.rows)
@@ -169,8 +169,10 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            # Prepare the knowledge base once and classify every symbol in one pass
+            entailed = KnowledgeSession(knowledge).classify(symbols)
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if entailed[symbol]:
                     print(f"    {symbol}")
 
 if __name__ == "__main__":
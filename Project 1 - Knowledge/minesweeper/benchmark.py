@@ -0,0 +1,147 @@
+import itertools
+import random
+import sys
+import time
+
+import simulate
+from minesweeper import Minesweeper, MinesweeperAI
+
+# Board sizes to time, as (height, width, mines) at the expert density of about 20%
+SIZES = [(8, 8, 10), (16, 16, 40), (16, 30, 99), (50, 50, 500), (100, 100, 2000)]
+
+
+def main():
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else len(SIZES)
+    compare_sizes(SIZES[:limit])
+    check_probabilities()
+    compare_guessing()
+    compare_compact()
+
+
+def play(height, width, mines, seed=0, compact=False, limit=None, guessing="random"):
+    """
+    Plays one game with the AI and returns the seconds each call to add_knowledge took,
+    the size of the knowledge base after each move and the sentences inference processed.
+    A mine hit by a guess is flagged instead of ending the game, so every game runs over
+    the whole board, or over its first limit moves.
+    """
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines, compact=compact)
+    ai = MinesweeperAI(height=height, width=width, mines=mines, guessing=guessing, compact=compact)
+    latencies = []
+    sizes = []
+    processed = []
+    while limit is None or len(latencies) < limit:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+            if move is None:
+                break
+        if game.is_mine(move):
+            ai.mark_mine(move)
+            continue
+        start = time.perf_counter()
+        ai.add_knowledge(move, game.nearby_mines(move))
+        latencies.append(time.perf_counter() - start)
+        sizes.append(len(ai.knowledge))
+        processed.append(ai.stats["processed"])
+    return latencies, sizes, processed
+
+
+def compare_sizes(sizes=SIZES):
+    """
+    Prints the mean and worst time per move, the sentences processed per move
+    and the largest knowledge base for growing boards.
+    """
+    for height, width, mines in sizes:
+        start = time.perf_counter()
+        latencies, sizes, processed = play(height, width, mines)
+        elapsed = time.perf_counter() - start
+        mean = sum(latencies) / len(latencies)
+        print(f"{height:>3}x{width:<3} {mines:>4} mines: {len(latencies):5} moves, "
+              f"mean {mean * 1000:7.3f}ms, worst {max(latencies) * 1000:8.2f}ms per move, "
+              f"{sum(processed) / len(processed):5.1f} processed per move, "
+              f"{max(sizes):5} sentences at most, {elapsed:.2f}s in all")
+
+
+def check_probabilities(positions=200, sizes=[(4, 4, 3), (4, 5, 5), (3, 6, 4)]):
+    """
+    Plays a few moves on small boards and checks the mine probabilities of the AI
+    against counting every placement of the remaining mines consistent with its knowledge.
+    """
+    checked = 0
+    for seed in range(positions):
+        random.seed(seed)
+        height, width, mines = sizes[seed % len(sizes)]
+        game = Minesweeper(height=height, width=width, mines=mines)
+        ai = MinesweeperAI(height=height, width=width, mines=mines, guessing="probability")
+        for _ in range(1 + seed % 6):
+            move = ai.make_safe_move() or ai.make_random_move()
+            if move is None or game.is_mine(move):
+                break
+            ai.add_knowledge(move, game.nearby_mines(move))
+
+        probabilities = ai.mine_probabilities()
+        unknown = sorted(probabilities)
+        placements = 0
+        tally = {cell: 0 for cell in unknown}
+        for placed in itertools.combinations(unknown, mines - len(ai.mines)):
+            placed = set(placed)
+            if all(len(placed & cells) == count for cells, count in ai.sentences):
+                placements += 1
+                for cell in placed:
+                    tally[cell] += 1
+        if placements == 0:
+            continue
+        for cell in unknown:
+            if abs(tally[cell] / placements - probabilities[cell]) > 1e-9:
+                raise Exception(f"probability of {cell} is {probabilities[cell]}, "
+                                f"not {tally[cell] / placements}, on board {seed}")
+        checked += 1
+    print(f"mine probabilities exact on {checked} positions")
+
+
+def compare_guessing(games=200, sizes=[(8, 8, 10), (16, 16, 40), (16, 30, 99)]):
+    """
+    Prints the share of games won guessing at random and by mine probability,
+    with the mean and worst time per guess.
+    """
+    for height, width, mines in sizes:
+        line = f"{height:>3}x{width:<3} {mines:>4} mines:"
+        for guessing in ["random", "probability"]:
+            results = [simulate.play_game((height, width, mines, guessing, seed, False)) for seed in range(games)]
+            wins = sum(result["won"] for result in results)
+            guesses = [ms for result in results for ms in result["guess_ms"]]
+            line += (f"  {guessing} {wins / games:6.1%} won, mean {sum(guesses) / len(guesses):6.2f}ms"
+                     f" worst {max(guesses):7.2f}ms per guess")
+        print(line)
+
+
+def compare_compact(sizes=[(300, 300, 18000), (1000, 1000, 200000)], moves=20000):
+    """
+    Prints the time to create a board and to play its first moves with the list board
+    and AI sets, and with the compact board and AI state, guessing at random and by
+    mine probability. The list board is skipped for boards over a hundred thousand cells.
+    """
+    for height, width, mines in sizes:
+        for guessing in ["random", "probability"]:
+            line = f"{height:>4}x{width:<4} {mines:>6} mines, {guessing:>11}:"
+            for compact in [False, True]:
+                if not compact and height * width > 100000:
+                    continue
+                random.seed(0)
+                start = time.perf_counter()
+                Minesweeper(height=height, width=width, mines=mines, compact=compact)
+                created = time.perf_counter() - start
+
+                start = time.perf_counter()
+                latencies, sizes, processed = play(height, width, mines, compact=compact, limit=moves,
+                                                   guessing=guessing)
+                elapsed = time.perf_counter() - start
+                line += (f"  {'compact' if compact else 'lists'} created in {created * 1000:7.1f}ms, "
+                         f"{len(latencies)} moves in {elapsed:6.2f}s")
+            print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,20 @@
 import itertools
+import math
 import random
+from collections import deque
+from collections.abc import Set
+
+# Most partial configurations the probability solver remembers for one frontier component,
+# beyond that the component gets a rough estimate so guessing stays interactive
+MAX_STATES = 20000
+
+# Flags of a cell in the compact state of the AI
+MOVED = 1
+SAFE = 2
+MINE = 4
+
+# Cells counted at a time when looking for the nth candidate of a compact board
+CHUNK = 4096
 
 
 class Minesweeper():
@@ -7,28 +22,51 @@ class Minesweeper():
     Minesweeper game representation
     """
 
-    def __init__(self, height=8, width=8, mines=8):
+    def __init__(self, height=8, width=8, mines=8, compact=False):
 
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
-        self.mines = set()
 
-        # Initialize an empty field with no mines
-        self.board = []
-        for i in range(self.height):
-            row = []
-            for j in range(self.width):
-                row.append(False)
-            self.board.append(row)
+        # A compact board keeps one byte per cell for mines and another for the number
+        # of mines around it, counted once here, instead of a list of lists.
+        # Its mines are then a view of those bytes rather than a set of cells
+        self.compact = compact
+        if compact:
+            self.board = None
+            self.mine_cells = bytearray(height * width)
+            self.mines = CellFlags(self.mine_cells, 1, width)
+        else:
+            self.mines = set()
+
+            # Initialize an empty field with no mines
+            self.board = []
+            for i in range(self.height):
+                row = []
+                for j in range(self.width):
+                    row.append(False)
+                self.board.append(row)
 
         # Add mines randomly
         while len(self.mines) != mines:
             i = random.randrange(height)
             j = random.randrange(width)
-            if not self.board[i][j]:
+            if not self.is_mine((i, j)):
                 self.mines.add((i, j))
-                self.board[i][j] = True
+                if not compact:
+                    self.board[i][j] = True
+
+        if compact:
+            # Every count at once: the mines as one integer with a byte per cell, summed with
+            # its copies shifted a cell sideways, then that sum with its copies shifted a row
+            # up and down. No count exceeds 9, so bytes never carry into each other
+            cells = height * width
+            grid = int.from_bytes(self.mine_cells, "little")
+            notFirst = int.from_bytes(bytes([0] + [255] * (width - 1)) * height, "little")
+            notLast = int.from_bytes(bytes([255] * (width - 1) + [0]) * height, "little")
+            rows = grid + ((grid << 8) & notFirst) + ((grid >> 8) & notLast)
+            around = rows + (rows << 8 * width) + (rows >> 8 * width) - grid
+            self.counts = bytearray((around & ((1 << 8 * cells) - 1)).to_bytes(cells, "little"))
 
         # At first, player has found no mines
         self.mines_found = set()
@@ -41,7 +79,7 @@ class Minesweeper():
         for i in range(self.height):
             print("--" * self.width + "-")
             for j in range(self.width):
-                if self.board[i][j]:
+                if self.is_mine((i, j)):
                     print("|X", end="")
                 else:
                     print("| ", end="")
@@ -50,6 +88,8 @@ class Minesweeper():
 
     def is_mine(self, cell):
         i, j = cell
+        if self.compact:
+            return self.mine_cells[i * self.width + j] == 1
         return self.board[i][j]
 
     def nearby_mines(self, cell):
@@ -58,6 +98,8 @@ class Minesweeper():
         within one row and column of a given cell,
         not including the cell itself.
         """
+        if self.compact:
+            return self.counts[cell[0] * self.width + cell[1]]
 
         # Keep count of nearby mines
         count = 0
@@ -84,6 +126,46 @@ class Minesweeper():
         return self.mines_found == self.mines
 
 
+class CellFlags(Set):
+    """
+    Set of the cells of a compact board with a flag set in its bytes, one byte per cell,
+    in place of a set of cells. Cells are only ever added, by setting the flag,
+    so its size is kept rather than counted.
+    """
+
+    def __init__(self, flags, flag, width):
+        self.flags = flags
+        self.flag = flag
+        self.width = width
+        # Maps each byte to 1 when it has the flag and 0 otherwise
+        self.table = bytes(1 if value & flag else 0 for value in range(256))
+        self.size = flags.translate(self.table).count(1)
+
+    @classmethod
+    def _from_iterable(cls, cells):
+        # Operators such as & and - give plain sets
+        return set(cells)
+
+    def add(self, cell):
+        index = cell[0] * self.width + cell[1]
+        if not self.flags[index] & self.flag:
+            self.flags[index] |= self.flag
+            self.size += 1
+
+    def __contains__(self, cell):
+        return bool(self.flags[cell[0] * self.width + cell[1]] & self.flag)
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        mask = self.flags.translate(self.table)
+        index = mask.find(1)
+        while index != -1:
+            yield divmod(index, self.width)
+            index = mask.find(1, index + 1)
+
+
 class Sentence():
     """
     Logical statement about a Minesweeper game
@@ -102,6 +184,12 @@ class Sentence():
     def __str__(self):
         return f"{self.cells} = {self.count}"
 
+    def key(self):
+        """
+        Returns the canonical form of the sentence, equal for equal sentences and hashable.
+        """
+        return (frozenset(self.cells), self.count)
+
     def known_mines(self):
         """
         Returns the set of all cells in self.cells known to be mines.
@@ -138,26 +226,175 @@ class Sentence():
             self.cells.remove(cell)
 
 
+class TooManyStates(Exception):
+    pass
+
+
+def configurations(cells, constraints, budget=MAX_STATES):
+    """
+    Counts the mine configurations of cells consistent with constraints, a list of
+    (cells, count) pairs covering them. Returns a dictionary mapping each number of mines k
+    to (ways, counts), where ways is the number of configurations with k mines and
+    counts[p] the number of those where cells[p] is a mine.
+
+    Cells are assigned in order by backtracking. What is left to place depends only on
+    the position and the mines still missing from the constraints started but not finished,
+    so the result of each such state is remembered. Raises TooManyStates past budget states.
+    """
+    n = len(cells)
+    position = {cell: p for p, cell in enumerate(cells)}
+    members = [sorted(position[cell] for cell in group) for group, count in constraints]
+    residual = [count for group, count in constraints]
+    left = [len(group) for group in members]
+    touching = [[] for p in range(n)]
+    for c, group in enumerate(members):
+        for p in group:
+            touching[p].append(c)
+
+    # Constraints with cells both before and from position p
+    active = [[c for c, group in enumerate(members) if group[0] < p <= group[-1]] for p in range(n + 1)]
+
+    memo = {}
+
+    def solve(p):
+        if p == n:
+            return {0: (1, [])}
+        key = (p, tuple(residual[c] for c in active[p]))
+        if key in memo:
+            return memo[key]
+        if len(memo) >= budget:
+            raise TooManyStates()
+
+        result = {}
+        for mine in (0, 1):
+            # Every constraint on the cell must still be able to reach its count
+            if any(not 0 <= residual[c] - mine <= left[c] - 1 for c in touching[p]):
+                continue
+            for c in touching[p]:
+                residual[c] -= mine
+                left[c] -= 1
+            rest = solve(p + 1)
+            for c in touching[p]:
+                residual[c] += mine
+                left[c] += 1
+
+            for k, (ways, counts) in rest.items():
+                if k + mine not in result:
+                    result[k + mine] = [0, [0] * (n - p)]
+                entry = result[k + mine]
+                entry[0] += ways
+                entry[1][0] += ways * mine
+                for q, count in enumerate(counts):
+                    entry[1][q + 1] += count
+
+        memo[key] = {k: (ways, counts) for k, (ways, counts) in result.items()}
+        return memo[key]
+
+    return solve(0)
+
+
+def logComb(n, k):
+    """
+    Returns the logarithm of the number of ways to choose k of n things.
+    """
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
+
+
+def convolve(first, second):
+    """
+    Returns the distribution of the total number of mines of two independent
+    distributions, dictionaries mapping a number of mines to a number of ways.
+    """
+    total = {}
+    for a, x in first.items():
+        for b, y in second.items():
+            total[a + b] = total.get(a + b, 0) + x * y
+    return total
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=None, guessing="random", compact=False):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Total number of mines, if known, and how to pick a move when none is known to be safe:
+        # "random" picks any cell, "probability" the one least likely to be a mine
+        if guessing not in ("random", "probability"):
+            raise ValueError(f"unknown guessing {guessing}")
+        if guessing == "probability" and mines is None:
+            raise ValueError("guessing by probability needs the number of mines")
+        self.total = mines
+        self.guessing = guessing
+
+        # With compact, the MOVED, SAFE and MINE flags of every cell are kept in one byte each,
+        # and the sets below are views of those bytes. Candidate moves are found with byte
+        # operations over the whole board, and safe cells not yet chosen wait on a stack
+        # instead of being searched for
+        self.compact = compact
+        if compact:
+            self.flags = bytearray(height * width)
+            self.unplayed = []
+
         # Keep track of which cells have been clicked on
-        self.moves_made = set()
+        self.moves_made = CellFlags(self.flags, MOVED, width) if compact else set()
 
         # Keep track of cells known to be safe or mines
-        self.mines = set()
-        self.safes = set()
+        self.mines = CellFlags(self.flags, MINE, width) if compact else set()
+        self.safes = CellFlags(self.flags, SAFE, width) if compact else set()
+
+        # Sentences about the game known to be true, keyed on their canonical form so
+        # a sentence is never stored twice
+        self.sentences = {}
+
+        # The sentences themselves, as a live view of the dictionary above
+        self.knowledge = self.sentences.values()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Canonical forms of the sentences mentioning each cell, so only sentences sharing
+        # cells with a changed one are ever looked at
+        self.index = {}
+
+        # Worklist of sentences added or changed since inference last looked at them,
+        # and of cells found to be safe or mines that are still to be marked
+        self.pending = deque()
+        self.events = deque()
+
+        # Work done by inference during the last move
+        self.stats = {"processed": 0, "inferred": 0, "collected": 0, "marked": 0}
+
+    def addSentence(self, sentence):
+        """
+        Adds a sentence to the knowledge base and the index.
+        Returns False if it is empty or already known.
+        """
+        key = sentence.key()
+        if len(sentence.cells) == 0 or key in self.sentences:
+            return False
+        self.sentences[key] = sentence
+        for cell in sentence.cells:
+            self.index.setdefault(cell, set()).add(key)
+        self.pending.append(sentence)
+        return True
+
+    def removeSentence(self, sentence):
+        key = sentence.key()
+        del self.sentences[key]
+        for cell in sentence.cells:
+            keys = self.index[cell]
+            keys.discard(key)
+            if not keys:
+                del self.index[cell]
+
+    def sentencesWith(self, cell):
+        """
+        Returns the sentences mentioning a cell.
+        """
+        return [self.sentences[key] for key in self.index.get(cell, ())]
 
     def mark_mine(self, cell):
         """
@@ -165,8 +402,11 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
+        for sentence in self.sentencesWith(cell):
+            # The canonical form changes with the sentence, so it is stored again
+            self.removeSentence(sentence)
             sentence.mark_mine(cell)
+            self.addSentence(sentence)
 
     def mark_safe(self, cell):
         """
@@ -174,8 +414,12 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
+        if self.compact and cell not in self.moves_made:
+            self.unplayed.append(cell)
+        for sentence in self.sentencesWith(cell):
+            self.removeSentence(sentence)
             sentence.mark_safe(cell)
+            self.addSentence(sentence)
 
     def add_knowledge(self, cell, count):
         """
@@ -211,60 +455,70 @@ class MinesweeperAI():
                     neighbors.add((i,j))
                 j += 1
             i += 1
-        if len(neighbors) != 0:
-            s = Sentence(neighbors, count)
-            self.knowledge.append(s)
-
+        self.addSentence(Sentence(neighbors, count))
 
         # 4 & 5
-        new_inferences = True
-        nrChanges = 1
-        while new_inferences:
-            new_inferences = False
-
-            # Mark new safe and mine cells
-            if self.updateMinesAndSafes():
-                new_inferences = True
-
-            # Starts off with the current new knowledge and continues to loop until no changes are found.
-            nrChanges = self.resolution(self.knowledge[-nrChanges:])
-            if nrChanges > 0:
-                new_inferences = True
+        self.propagate()
 
 
-    def updateMinesAndSafes(self):
-        safes = set()
-        mines = set()
-        for sentence in self.knowledge:
-            safes.update(sentence.known_safes())
-            mines.update(sentence.known_mines())
-
-        changed = False
-
-        for safe in safes:
-            if safe not in self.safes:
-                self.mark_safe(safe)
-                changed = True
-        for mine in mines:
-            if mine not in self.mines:
-                self.mark_mine(mine)
-                changed = True
-
-        return changed
+    def propagate(self):
+        """ Runs inference until the worklist is empty.
+            Known cells are marked first, as that shrinks the sentences still waiting.
+            A sentence whose cells are all safe or all mines is removed and its cells marked,
+            any other one is compared against the sentences sharing a cell with it.
+        """
+        for name in self.stats:
+            self.stats[name] = 0
+
+        while self.events or self.pending:
+            if self.events:
+                cell, mine = self.events.popleft()
+                if mine and cell not in self.mines:
+                    self.mark_mine(cell)
+                    self.stats["marked"] += 1
+                elif not mine and cell not in self.safes:
+                    self.mark_safe(cell)
+                    self.stats["marked"] += 1
+                continue
+
+            # Sentences changed again or removed since they were queued are stale
+            sentence = self.pending.popleft()
+            if self.sentences.get(sentence.key()) is not sentence:
+                continue
+            self.stats["processed"] += 1
+
+            mines = sentence.known_mines()
+            safes = sentence.known_safes()
+            if mines or safes:
+                self.removeSentence(sentence)
+                self.stats["collected"] += 1
+                self.events.extend((cell, True) for cell in mines)
+                self.events.extend((cell, False) for cell in safes)
+            else:
+                self.stats["inferred"] += self.resolution([sentence])
 
 
     def resolution(self, sentenceList):
-        """ Uses a list of sentences to compare against the current knowledge.
+        """ Compares each sentence of a list against the sentences sharing a cell with it.
+            When one has a subset of the cells of the other, the difference is a new sentence.
             Returns the number of inferences found
         """
         changes = 0
         for s in sentenceList:
-            for sentence in self.knowledge:
-                if s.cells != sentence.cells and s.cells.issubset(sentence.cells):
-                    newSentence = Sentence(sentence.cells.difference(s.cells), sentence.count - s.count)
-                    if len(newSentence.cells) > 0 and newSentence not in self.knowledge:
-                        self.knowledge.append(newSentence)
-                        changes += 1
+            neighbors = set()
+            for cell in s.cells:
+                neighbors.update(self.index.get(cell, ()))
+            for cells, count in neighbors:
+                if cells == s.cells:
+                    continue
+                if s.cells.issubset(cells):
+                    newSentence = Sentence(cells.difference(s.cells), count - s.count)
+                elif cells.issubset(s.cells):
+                    newSentence = Sentence(s.cells.difference(cells), s.count - count)
+                else:
+                    continue
+                if self.addSentence(newSentence):
+                    changes += 1
         return changes
 
 
@@ -277,6 +531,15 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
+        if self.compact:
+            # Cells chosen since they were found safe are dropped from the stack on the way
+            while self.unplayed:
+                i, j = self.unplayed[-1]
+                if not self.flags[i * self.width + j] & MOVED:
+                    return (i, j)
+                self.unplayed.pop()
+            return None
+
         for safe in self.safes:
             if safe not in self.moves_made:
                 return safe
@@ -288,7 +551,13 @@ class MinesweeperAI():
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+        When guessing by probability, chooses the cell least likely to be a mine instead.
         """
+        if self.guessing == "probability":
+            return self.make_probable_move()
+        if self.compact:
+            return self.randomCell(MOVED | MINE)
+
         possibleMoves = []
         board = set(itertools.product(range(self.height), range(self.width)))
         for cell in board:
@@ -297,4 +566,195 @@ class MinesweeperAI():
         if len(possibleMoves) == 0:
             return None
         else:
-            return random.choice(possibleMoves)
\ No newline at end of file
+            return random.choice(possibleMoves)
+
+
+    def randomCell(self, excluded):
+        """
+        Returns a random cell of a compact board with none of the excluded flags, or None.
+        The flags are mapped to a mask of zeros for candidates, then whole chunks
+        of the mask are counted to find the chosen candidate.
+        """
+        mask = self.flags.translate(bytes(1 if flags & excluded else 0 for flags in range(256)))
+        candidates = mask.count(0)
+        if candidates == 0:
+            return None
+        n = random.randrange(candidates)
+        start = 0
+        while True:
+            inChunk = mask.count(0, start, start + CHUNK)
+            if n < inChunk:
+                break
+            n -= inChunk
+            start += CHUNK
+        index = mask.find(0, start)
+        for _ in range(n):
+            index = mask.find(0, index + 1)
+        return divmod(index, self.width)
+
+
+    def make_probable_move(self):
+        """
+        Returns the cell least likely to be a mine among those not chosen
+        and not known to be mines, choosing randomly among equals.
+        """
+        probabilities, outside, outsideCount = self.frontierProbabilities()
+        if not probabilities and not outsideCount:
+            return None
+        lowest = min(list(probabilities.values()) + ([outside] if outsideCount else []))
+        ties = sorted(cell for cell, p in probabilities.items() if p == lowest)
+
+        # Cells outside the frontier are only listed when one of them is chosen
+        if outsideCount and outside == lowest and random.randrange(len(ties) + outsideCount) >= len(ties):
+            while True:
+                cell = self.randomUnknown()
+                if cell not in probabilities:
+                    return cell
+        return random.choice(ties)
+
+
+    def randomUnknown(self):
+        """
+        Returns a random cell not chosen and not known to be safe or a mine.
+        """
+        if self.compact:
+            return self.randomCell(MOVED | SAFE | MINE)
+        return random.choice([(i, j) for i in range(self.height) for j in range(self.width)
+                              if (i, j) not in self.moves_made and (i, j) not in self.mines
+                              and (i, j) not in self.safes])
+
+
+    def mine_probabilities(self):
+        """
+        Returns the probability that each cell not chosen and not known to be a mine is one,
+        with every arrangement of the remaining mines consistent with the knowledge equally likely.
+        """
+        probabilities, outside, outsideCount = self.frontierProbabilities()
+        if outsideCount:
+            for i in range(self.height):
+                for j in range(self.width):
+                    cell = (i, j)
+                    if (cell not in self.moves_made and cell not in self.mines and cell not in self.safes
+                            and cell not in probabilities):
+                        probabilities[cell] = outside
+        return probabilities
+
+
+    def frontierProbabilities(self):
+        """
+        Returns (probabilities, outside, outsideCount): the mine probability of each cell in
+        sentences, the frontier, the probability shared by the outsideCount other unknown cells.
+
+        The frontier splits into components sharing no sentence.
+        Each component's configurations are counted by number of mines, and a combination
+        of components with K mines in all is weighted by the ways to place the other mines
+        among the cells no sentence mentions.
+        """
+        # Cells chosen were marked safe as well
+        unknown = self.height * self.width - len(self.safes) - len(self.mines)
+        if unknown == 0:
+            return {}, None, 0
+        components = self.frontierComponents()
+        frontier = set().union(*[cells for cells, constraints in components])
+        outside = unknown - len(frontier)
+        remaining = self.total - len(self.mines)
+
+        # Count each component's configurations, falling back to an estimate when it has too many
+        distributions = []
+        for cells, constraints in components:
+            try:
+                distributions.append(configurations(cells, constraints))
+            except TooManyStates:
+                distributions.append(self.estimateComponent(cells, constraints))
+
+        def logWeights(totals, extra=0):
+            """
+            Logarithms of the ways to complete each total of frontier mines, with extra mines fixed
+            elsewhere. The binomials get far too large to compute exactly on large boards.
+            """
+            return {k: math.log(ways) + logComb(outside, remaining - k - extra) for k, ways in totals.items()
+                    if 0 <= remaining - k - extra <= outside}
+
+        everything = {0: 1}
+        for distribution in distributions:
+            everything = convolve(everything, {k: ways for k, (ways, counts) in distribution.items()})
+        weights = logWeights(everything)
+        if not weights:
+            # The knowledge contradicts the number of mines, guess uniformly
+            return {cell: 1 / unknown for cell in frontier}, 1 / unknown, outside
+
+        # Every probability is a ratio of sums of weights, so the weights are scaled
+        # by the largest one in the sum before leaving logarithms
+        probabilities = {}
+        for c, (cells, constraints) in enumerate(components):
+            others = {0: 1}
+            for d, distribution in enumerate(distributions):
+                if d != c:
+                    others = convolve(others, {k: ways for k, (ways, counts) in distribution.items()})
+            shares = {k: [math.log(ways) + weight for weight in logWeights(others, k).values()]
+                      for k, (ways, counts) in distributions[c].items()}
+            top = max(weight for weights in shares.values() for weight in weights)
+            total = 0
+            mineWays = [0] * len(cells)
+            for k, (ways, counts) in distributions[c].items():
+                share = sum(math.exp(weight - top) for weight in shares[k])
+                total += share
+                for p, count in enumerate(counts):
+                    mineWays[p] += count / ways * share
+            for p, cell in enumerate(cells):
+                probabilities[cell] = mineWays[p] / total
+
+        # Cells outside the frontier all share the mines no component takes,
+        # of the ways to place remaining - k mines outside, a given cell holds one in (remaining - k) / outside
+        if not outside:
+            return probabilities, None, 0
+        top = max(weights.values())
+        total = sum(math.exp(weight - top) for weight in weights.values())
+        inside = sum(math.exp(weight - top) * (remaining - k) / outside for k, weight in weights.items())
+        return probabilities, inside / total, outside
+
+
+    def frontierComponents(self):
+        """
+        Returns the frontier as a list of (cells, constraints) components, where constraints
+        are the (cells, count) sentences over the component and cells are ordered so that
+        sentences are completed soon after they are started.
+        """
+        seen = set()
+        components = []
+        for start in self.index:
+            if start in seen:
+                continue
+            seen.add(start)
+            cells = []
+            keys = set()
+            queue = deque([start])
+            while queue:
+                cell = queue.popleft()
+                cells.append(cell)
+                for key in self.index[cell]:
+                    if key in keys:
+                        continue
+                    keys.add(key)
+                    for other in sorted(key[0]):
+                        if other not in seen:
+                            seen.add(other)
+                            queue.append(other)
+            components.append((cells, list(keys)))
+        return components
+
+
+    def estimateComponent(self, cells, constraints):
+        """
+        Returns a distribution in the form of configurations for a component too large to count.
+        Its mines are spread as the densest sentence on each cell suggests, as if there were
+        a thousand configurations, so the counts stay integers.
+        """
+        density = {cell: 0.0 for cell in cells}
+        for group, count in constraints:
+            for cell in group:
+                density[cell] = max(density[cell], count / len(group))
+        mines = round(sum(density.values()))
+        scale = mines / sum(density.values()) if mines else 0
+        return {mines: (1000, [round(1000 * density[cell] * scale) for cell in cells])}
+
@@ -0,0 +1,127 @@
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python simulate.py [--games N] [--height H] [--width W] [--mines M] [--seed S] "
+              "[--workers N] [--guessing random|probability] [--compact] [--json]")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--height", type=int, default=8)
+    parser.add_argument("--width", type=int, default=8)
+    parser.add_argument("--mines", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the first game, game k uses seed + k")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--guessing", choices=["random", "probability"], default="probability")
+    parser.add_argument("--compact", action="store_true",
+                        help="use the compact board and AI state, for very large boards")
+    parser.add_argument("--json", action="store_true",
+                        help="print one JSON line per game to stdout")
+    args = parser.parse_args()
+    if args.mines >= args.height * args.width:
+        sys.exit("There must be fewer mines than cells.")
+
+    games = [(args.height, args.width, args.mines, args.guessing, args.seed + k, args.compact)
+             for k in range(args.games)]
+    start = time.perf_counter()
+    results = []
+    for result in run_games(games, args.workers):
+        results.append(result)
+        if args.json:
+            print(json.dumps({name: value for name, value in result.items()
+                              if name not in ("inference_ms", "guess_ms", "knowledge")}), flush=True)
+
+    report(results, time.perf_counter() - start)
+
+
+def run_games(games, workers):
+    """
+    Yields the result of every (height, width, mines, guessing, seed, compact) game, in order.
+    With more than one worker the games run in a process pool.
+    """
+    if workers <= 1:
+        yield from map(play_game, games)
+        return
+
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap(play_game, games, chunksize=8)
+
+
+def play_game(game):
+    """
+    Plays one game without any display until it is won or a mine is hit,
+    returning a JSON serializable dictionary. The seed decides both the board and
+    the random choices of the AI, so a game plays the same in any worker.
+    """
+    height, width, mines, guessing, seed, compact = game
+    random.seed(seed)
+    board = Minesweeper(height=height, width=width, mines=mines, compact=compact)
+    ai = MinesweeperAI(height=height, width=width, mines=mines, guessing=guessing, compact=compact)
+    result = {"seed": seed, "won": False, "moves": 0, "guesses": 0,
+              "inference_ms": [], "guess_ms": [], "knowledge": []}
+
+    while len(ai.moves_made) < height * width - mines:
+        move = ai.make_safe_move()
+        if move is None:
+            start = time.perf_counter()
+            move = ai.make_random_move()
+            result["guess_ms"].append((time.perf_counter() - start) * 1000)
+            result["guesses"] += 1
+        result["moves"] += 1
+        if board.is_mine(move):
+            return result
+
+        start = time.perf_counter()
+        ai.add_knowledge(move, board.nearby_mines(move))
+        result["inference_ms"].append((time.perf_counter() - start) * 1000)
+        result["knowledge"].append(len(ai.knowledge))
+
+    result["won"] = True
+    return result
+
+
+def percentiles(values, unit=""):
+    """
+    Returns the 50th, 90th and 99th percentiles and the maximum of values as text.
+    """
+    if not values:
+        return "none"
+    values = sorted(values)
+    summary = ", ".join(
+        f"p{percentile} {values[min(len(values) - 1, len(values) * percentile // 100)]:.2f}{unit}"
+        for percentile in (50, 90, 99)
+    )
+    return f"{summary}, max {values[-1]:.2f}{unit}"
+
+
+def report(results, elapsed):
+    """
+    Prints the win rate and the distributions of moves, inference time,
+    guess time and knowledge base size over all games to stderr.
+    """
+    if not results:
+        print("No games.", file=sys.stderr)
+        return
+    wins = sum(result["won"] for result in results)
+    lines = [
+        f"{len(results)} games in {elapsed:.2f}s: {wins} won ({wins / len(results):.1%})",
+        f"moves per game: {percentiles([result['moves'] for result in results])}",
+        f"guesses per game: {percentiles([result['guesses'] for result in results])}",
+        f"inference per move: {percentiles([ms for result in results for ms in result['inference_ms']], 'ms')}",
+        f"time per guess: {percentiles([ms for result in results for ms in result['guess_ms']], 'ms')}",
+        f"knowledge base size: {percentiles([size for result in results for size in result['knowledge']])}",
+    ]
+    for line in lines:
+        print(line, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()